@@ -36,11 +36,32 @@ class AnthropicEngine(BaseAIEngine):
         # Default models for Anthropic
         if not config.model:
             config.model = "claude-3-sonnet-20240229"
+        
+        # One HTTP session is reused across calls so connections stay pooled;
+        # it is created lazily inside the running event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
     
     def get_engine_type(self) -> str:
         """Return the engine type identifier"""
         return "anthropic"
     
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, opening one for the current loop if needed"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            timeout = aiohttp.ClientTimeout(total=self.config.timeout_seconds)
+            self._session = aiohttp.ClientSession(timeout=timeout)
+            self._session_loop = loop
+        return self._session
+    
+    async def aclose(self):
+        """Close the shared HTTP session; the next call opens a new one"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+    
     def _prepare_headers(self) -> Dict[str, str]:
         """Prepare headers for Anthropic API requests"""
         return {
@@ -140,35 +161,33 @@ class AnthropicEngine(BaseAIEngine):
         
         logger.debug(f"Making Anthropic API call to {url}")
         
-        timeout = aiohttp.ClientTimeout(total=self.config.timeout_seconds)
-        
         try:
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(url, headers=headers, json=payload) as response:
-                    response_data = await response.json()
-                    
-                    # Handle API errors
-                    if response.status != 200:
-                        error_msg = response_data.get("error", {}).get("message", "Unknown error")
-                        error_type = response_data.get("error", {}).get("type", "api_error")
-                        
-                        logger.error(f"Anthropic API error {response.status}: {error_msg}")
-                        
-                        # Handle specific error types
-                        if response.status == 401:
-                            raise ValueError(f"Authentication failed: {error_msg}")
-                        elif response.status == 429:
-                            raise ValueError(f"Rate limit exceeded: {error_msg}")
-                        elif response.status == 400:
-                            raise ValueError(f"Invalid request: {error_msg}")
-                        elif response.status >= 500:
-                            raise ConnectionError(f"Server error: {error_msg}")
-                        else:
-                            raise ValueError(f"API error ({error_type}): {error_msg}")
+            session = self._get_session()
+            async with session.post(url, headers=headers, json=payload) as response:
+                response_data = await response.json()
+                
+                # Handle API errors
+                if response.status != 200:
+                    error_msg = response_data.get("error", {}).get("message", "Unknown error")
+                    error_type = response_data.get("error", {}).get("type", "api_error")
                     
-                    # Parse successful response
-                    return self._parse_response(response_data, payload["model"])
+                    logger.error(f"Anthropic API error {response.status}: {error_msg}")
                     
+                    # Handle specific error types
+                    if response.status == 401:
+                        raise ValueError(f"Authentication failed: {error_msg}")
+                    elif response.status == 429:
+                        raise ValueError(f"Rate limit exceeded: {error_msg}")
+                    elif response.status == 400:
+                        raise ValueError(f"Invalid request: {error_msg}")
+                    elif response.status >= 500:
+                        raise ConnectionError(f"Server error: {error_msg}")
+                    else:
+                        raise ValueError(f"API error ({error_type}): {error_msg}")
+                
+                # Parse successful response
+                return self._parse_response(response_data, payload["model"])
+                
         except aiohttp.ClientTimeout:
             logger.error(f"Request timeout after {self.config.timeout_seconds}s")
             raise ConnectionError("Request timeout")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Output buffering for the test scripts that run several tests at once
+"""
+import asyncio
+import contextlib
+import contextvars
+import io
+import sys
+from typing import Any, Awaitable, Callable, Iterable, Iterator, List, Tuple
+
+
+# Output buffer of the test running in the current task, if any
+_test_output: contextvars.ContextVar = contextvars.ContextVar("_test_output", default=None)
+
+
+class _TestStdout:
+    """
+    Route print() into the running test's buffer so concurrent tests don't interleave.
+    
+    flush() from inside a test writes what it has buffered so far in one call,
+    so a test can emit its output phase by phase.
+    """
+    
+    def __init__(self, stream):
+        self.stream = stream
+    
+    def write(self, text):
+        buffer = _test_output.get()
+        return (buffer if buffer is not None else self.stream).write(text)
+    
+    def flush(self):
+        buffer = _test_output.get()
+        if buffer is not None:
+            self.stream.write(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+        self.stream.flush()
+
+
+async def run_buffered(test: Callable[[], Awaitable[Any]]) -> Tuple[str, Any]:
+    """Run one test with its output captured; return (output, result or exception)"""
+    buffer = io.StringIO()
+    _test_output.set(buffer)
+    try:
+        result = await test()
+    except Exception as e:
+        result = e
+    return buffer.getvalue(), result
+
+
+async def gather_buffered(tests: Iterable[Callable[[], Awaitable[Any]]]) -> List[Tuple[str, Any]]:
+    """Run tests concurrently, each with its own output buffer; return run_buffered's pairs in order"""
+    stdout = sys.stdout
+    sys.stdout = _TestStdout(stdout)
+    try:
+        return list(await asyncio.gather(*(run_buffered(test) for test in tests)))
+    finally:
+        sys.stdout = stdout
+
+
+@contextlib.contextmanager
+def buffered_stdout() -> Iterator[None]:
+    """Buffer print() output for a single test, writing it out on each flush() and at exit"""
+    stdout = sys.stdout
+    token = _test_output.set(io.StringIO())
+    sys.stdout = _TestStdout(stdout)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stdout = stdout
+        _test_output.reset(token)
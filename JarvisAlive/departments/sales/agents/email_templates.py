@@ -1,6 +1,33 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel
 from enum import Enum
+import re
+import sys
+
+
+# {{variable}} placeholders; split() with the capture group yields
+# alternating literal text and variable names
+_VAR_RE = re.compile(r"\{\{(\w+)\}\}")
+
+
+def compile_template(text: str) -> Tuple[str, ...]:
+    """Split template text into [literal, var, literal, var, ..., literal] segments"""
+    # Variable names are interned so lookups against the composer's literal
+    # dict keys hit the identity fast path
+    return tuple(
+        sys.intern(part) if i % 2 else part
+        for i, part in enumerate(_VAR_RE.split(text))
+    )
+
+
+def fill_template(segments: Tuple[str, ...], variables: Dict[str, str]) -> str:
+    """Join compiled segments, substituting known variables and keeping unknown placeholders"""
+    parts = list(segments)
+    parts[1::2] = [
+        str(variables[var]) if var in variables else f"{{{{{var}}}}}"
+        for var in segments[1::2]
+    ]
+    return "".join(parts)
 
 
 class ToneStyle(str, Enum):
@@ -24,6 +51,10 @@ class EmailTemplate(BaseModel):
 class EmailTemplateLibrary:
     def __init__(self):
         self.templates = self._load_templates()
+        self.compiled: Dict[str, Tuple[str, ...]] = {}
+        for template in self.templates.values():
+            for text in [template.body_template, *template.subject_lines]:
+                self.compiled[text] = compile_template(text)
     
     def _load_templates(self) -> Dict[str, EmailTemplate]:
         """Load all email templates"""
@@ -428,6 +459,14 @@ Best regards,
         """Get a specific template by ID"""
         return self.templates.get(template_id)
     
+    def get_compiled(self, text: str) -> Tuple[str, ...]:
+        """Get pre-split segments for a template body or subject line"""
+        compiled = self.compiled.get(text)
+        if compiled is None:
+            # Text from outside the library (e.g. already edited); not cached
+            compiled = compile_template(text)
+        return compiled
+    
     def get_templates_by_category(self, category: str) -> List[EmailTemplate]:
         """Get all templates in a specific category"""
         return [t for t in self.templates.values() if t.category == category]
@@ -1,16 +1,28 @@
-from typing import List, Dict, Optional, Literal
+from typing import List, Dict, Optional, Literal, Tuple
 from datetime import datetime, timedelta
 from pydantic import BaseModel, validator
 import logging
 import uuid
+import hashlib
 import asyncio
 from collections import defaultdict
 import re
 import json
+import functools
 import sys
 import os
 import redis.asyncio as redis
 
+# orjson encodes and parses cached scan results faster; fall back to the
+# stdlib if absent. Either way datetimes are stored as strings pydantic parses.
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = functools.partial(orjson.dumps, default=str)
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = functools.partial(json.dumps, default=str, separators=(",", ":"))
+
 # Add ai_engines to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
@@ -78,7 +90,12 @@ class ScanCriteria(BaseModel):
 
 
 class LeadScannerAgent:
-    def __init__(self, mode: Literal["mock", "hybrid", "ai", "hubspot"] = "mock", config: Optional[Dict] = None):
+    def __init__(
+        self,
+        mode: Literal["mock", "hybrid", "ai", "hubspot"] = "mock",
+        config: Optional[Dict] = None,
+        redis_client: Optional[redis.Redis] = None
+    ):
         self.mode = mode
         self.config = config or {}
         self.logger = logging.getLogger(__name__)
@@ -95,11 +112,31 @@ class LeadScannerAgent:
         # Initialize HubSpot integration if needed
         self.hubspot_client = None
         self.auth_manager = None
-        self.redis_client = None
+        self.redis_client = redis_client  # Shared client, if the caller has one
+        self._owns_redis = False  # Only a client opened by _initialize_hubspot is closed by aclose()
         self.user_id = config.get('user_id') if config else None
         
+        # HubSpot setup runs in the background; await ready() before scanning
+        self._init_task: Optional[asyncio.Task] = None
         if mode == "hubspot":
-            asyncio.create_task(self._initialize_hubspot())
+            self._init_task = asyncio.create_task(self._initialize_hubspot())
+
+    async def ready(self):
+        """Wait until background initialization has finished"""
+        if self._init_task is not None:
+            await self._init_task
+    
+    async def aclose(self):
+        """Release the agent's AI engine HTTP session and any Redis client it opened"""
+        if self._init_task is not None:
+            await asyncio.gather(self._init_task, return_exceptions=True)
+        if self.redis_client is not None and self._owns_redis:
+            await self.redis_client.aclose()
+            self.redis_client = None
+            self._owns_redis = False
+        engine_close = getattr(self.ai_engine, "aclose", None)
+        if engine_close is not None:
+            await engine_close()
 
     def _setup_scoring_weights(self):
         """Setup configurable scoring weights"""
@@ -528,9 +565,11 @@ class LeadScannerAgent:
     async def _initialize_hubspot(self):
         """Initialize HubSpot integration with credentials from Supabase"""
         try:
-            # Initialize Redis for caching
-            redis_url = self.config.get('redis_url', 'redis://localhost:6379')
-            self.redis_client = await redis.from_url(redis_url)
+            # Initialize Redis for caching, unless a client was passed in
+            if self.redis_client is None:
+                redis_url = self.config.get('redis_url', 'redis://localhost:6379')
+                self.redis_client = await redis.from_url(redis_url)
+                self._owns_redis = True
             
             # Initialize auth manager
             self.auth_manager = SupabaseAuthManager(
@@ -577,75 +616,181 @@ class LeadScannerAgent:
             
             # Search HubSpot contacts
             hubspot_contacts = await self.hubspot_client.search_contacts_by_criteria(
-                title_keywords=criteria.titles,
-                industries=criteria.industries,
-                company_size_min=self._get_company_size_min(criteria.company_sizes),
-                company_size_max=self._get_company_size_max(criteria.company_sizes),
-                last_activity_days=180,  # Look for active contacts
-                lifecycle_stages=["lead", "marketingqualifiedlead", "salesqualifiedlead"],
+                **self._hubspot_search_filters(criteria),
                 limit=criteria.max_results * 2  # Get extra to account for filtering
             )
             
-            # Score and convert to Lead objects
-            scored_leads = []
-            for hs_contact in hubspot_contacts:
-                try:
-                    # Get associated company if available
-                    company_data = await self._get_hubspot_company_data(hs_contact)
-                    
-                    # Convert to our models
-                    contact = self._convert_hubspot_contact(hs_contact)
-                    company = self._convert_hubspot_company(company_data) if company_data else self._create_default_company(hs_contact)
-                    
-                    # Calculate score with HubSpot activity data
-                    score = await self._score_hubspot_lead(hs_contact, contact, company, criteria)
-                    
-                    # Skip leads below minimum score
-                    if score.total_score < criteria.min_score:
-                        continue
-                    
-                    # Determine outreach priority
-                    priority = self._determine_priority(score.total_score)
-                    
-                    lead = Lead(
-                        lead_id=f"lead_{hs_contact.id}",
-                        contact=contact,
-                        company=company,
-                        score=score,
-                        discovered_at=datetime.now(),
-                        source="hubspot",
-                        enrichment_data={
-                            "hubspot_id": hs_contact.id,
-                            "lifecycle_stage": hs_contact.lifecyclestage,
-                            "last_activity": hs_contact.notes_last_contacted.isoformat() if hs_contact.notes_last_contacted else None,
-                            "email_engagement": {
-                                "opens": hs_contact.hs_email_open,
-                                "clicks": hs_contact.hs_email_click
-                            }
-                        },
-                        outreach_priority=priority
-                    )
-                    scored_leads.append(lead)
-                    
-                except Exception as e:
-                    self.logger.error(f"Error processing HubSpot contact {hs_contact.id}: {e}")
-                    continue
+            return await self._build_hubspot_leads(hubspot_contacts, criteria)
             
-            # Sort by score (descending)
-            scored_leads.sort(key=lambda x: x.score.total_score, reverse=True)
+        except Exception as e:
+            self.logger.error(f"Error in HubSpot scan: {e}")
+            # Fall back to mock data
+            return await self._scan_mock_data(criteria)
+    
+    async def scan_for_leads_batch(self, criteria_list: List[ScanCriteria]) -> List[List[Lead]]:
+        """
+        Scan for several criteria at once, returning one result list per criteria.
+        
+        In HubSpot mode, criteria that map to the same filter groups (e.g. ones
+        differing only in min_score or max_results) share one contact search,
+        and the distinct searches run concurrently. Each criteria gets exactly
+        the contacts its own search would return, and scores and filters them
+        itself. Other modes scan each criteria concurrently.
+        """
+        if self.mode != "hubspot" or not self.hubspot_client:
+            return list(await asyncio.gather(*(self.scan_for_leads(c) for c in criteria_list)))
+        
+        try:
+            self.logger.info(f"Starting batched HubSpot scan for {len(criteria_list)} criteria")
             
-            # Apply max_results limit
-            final_leads = scored_leads[:criteria.max_results]
+            # Distinct searches by their filter groups, each fetching enough
+            # contacts for the largest criteria that needs it. Groups are not
+            # merged across searches: HubSpot allows 5 per search, which one
+            # criteria can already use up.
+            searches: Dict[str, Tuple[List[Dict], int]] = {}
+            search_keys = []
+            for criteria in criteria_list:
+                filter_groups = self.hubspot_client.build_contact_filter_groups(
+                    **self._hubspot_search_filters(criteria)
+                )
+                key = json.dumps(filter_groups, sort_keys=True)
+                limit = criteria.max_results * 2  # Get extra to account for filtering
+                if key in searches:
+                    limit = max(limit, searches[key][1])
+                searches[key] = (filter_groups, limit)
+                search_keys.append(key)
             
-            # Log metrics
-            self._log_scan_metrics(criteria, final_leads)
+            found = await asyncio.gather(*(
+                self.hubspot_client.search_contacts_by_filter_groups(filter_groups, limit=limit)
+                for filter_groups, limit in searches.values()
+            ))
+            contacts_by_search = dict(zip(searches, found))
             
-            return final_leads
+            # Results are sorted by engagement, so a criteria with a smaller
+            # limit takes the same leading contacts its own search would get
+            return list(await asyncio.gather(*(
+                self._build_hubspot_leads(contacts_by_search[key][:criteria.max_results * 2], criteria)
+                for key, criteria in zip(search_keys, criteria_list)
+            )))
             
         except Exception as e:
-            self.logger.error(f"Error in HubSpot scan: {e}")
+            self.logger.error(f"Error in batched HubSpot scan: {e}")
             # Fall back to mock data
-            return await self._scan_mock_data(criteria)
+            return [await self._scan_mock_data(c) for c in criteria_list]
+    
+    async def scan_for_leads_many(self, criteria_list: List[ScanCriteria]) -> List[List[Lead]]:
+        """
+        Like scan_for_leads_batch, but answered from Redis where possible.
+        
+        Cached results are fetched with one MGET, only the misses are scanned
+        (as one batch), and their results are written back in one pipeline.
+        Without a Redis client this is just scan_for_leads_batch.
+        """
+        if self.redis_client is None:
+            return await self.scan_for_leads_batch(criteria_list)
+        
+        keys = [self._scan_cache_key(c) for c in criteria_list]
+        try:
+            cached = await self.redis_client.mget(keys)
+        except Exception as e:
+            self.logger.warning(f"Scan cache get error: {e}")
+            cached = [None] * len(keys)
+        
+        results: List[Optional[List[Lead]]] = [
+            [Lead.parse_obj(lead) for lead in _json_loads(raw)] if raw else None
+            for raw in cached
+        ]
+        misses = [i for i, leads in enumerate(results) if leads is None]
+        if misses:
+            scanned = await self.scan_for_leads_batch([criteria_list[i] for i in misses])
+            for i, leads in zip(misses, scanned):
+                results[i] = leads
+            
+            ttl = self.config.get('scan_cache_ttl', 300)
+            try:
+                pipe = self.redis_client.pipeline()
+                for i in misses:
+                    pipe.set(keys[i], _json_dumps([lead.dict() for lead in results[i]]), ex=ttl)
+                await pipe.execute()
+            except Exception as e:
+                self.logger.warning(f"Scan cache set error: {e}")
+        
+        return results
+    
+    def _scan_cache_key(self, criteria: ScanCriteria) -> str:
+        """Redis key for this agent's scan results for the criteria"""
+        criteria_hash = hashlib.md5(criteria.json().encode()).hexdigest()
+        return f"lead_scan:{self.mode}:{self.user_id or 'anonymous'}:{criteria_hash}"
+    
+    def _hubspot_search_filters(self, criteria: ScanCriteria) -> Dict:
+        """HubSpot contact search filters for the given criteria"""
+        return {
+            "title_keywords": criteria.titles,
+            "industries": criteria.industries,
+            "company_size_min": self._get_company_size_min(criteria.company_sizes),
+            "company_size_max": self._get_company_size_max(criteria.company_sizes),
+            "last_activity_days": 180,  # Look for active contacts
+            "lifecycle_stages": ["lead", "marketingqualifiedlead", "salesqualifiedlead"]
+        }
+    
+    async def _build_hubspot_leads(self, hubspot_contacts: List[HubSpotContact],
+                                   criteria: ScanCriteria) -> List[Lead]:
+        """Score HubSpot contacts against the criteria and return the top leads"""
+        # Score and convert to Lead objects
+        scored_leads = []
+        for hs_contact in hubspot_contacts:
+            try:
+                # Get associated company if available
+                company_data = await self._get_hubspot_company_data(hs_contact)
+                
+                # Convert to our models
+                contact = self._convert_hubspot_contact(hs_contact)
+                company = self._convert_hubspot_company(company_data) if company_data else self._create_default_company(hs_contact)
+                
+                # Calculate score with HubSpot activity data
+                score = await self._score_hubspot_lead(hs_contact, contact, company, criteria)
+                
+                # Skip leads below minimum score
+                if score.total_score < criteria.min_score:
+                    continue
+                
+                # Determine outreach priority
+                priority = self._determine_priority(score.total_score)
+                
+                lead = Lead(
+                    lead_id=f"lead_{hs_contact.id}",
+                    contact=contact,
+                    company=company,
+                    score=score,
+                    discovered_at=datetime.now(),
+                    source="hubspot",
+                    enrichment_data={
+                        "hubspot_id": hs_contact.id,
+                        "lifecycle_stage": hs_contact.lifecyclestage,
+                        "last_activity": hs_contact.notes_last_contacted.isoformat() if hs_contact.notes_last_contacted else None,
+                        "email_engagement": {
+                            "opens": hs_contact.hs_email_open,
+                            "clicks": hs_contact.hs_email_click
+                        }
+                    },
+                    outreach_priority=priority
+                )
+                scored_leads.append(lead)
+                
+            except Exception as e:
+                self.logger.error(f"Error processing HubSpot contact {hs_contact.id}: {e}")
+                continue
+        
+        # Sort by score (descending)
+        scored_leads.sort(key=lambda x: x.score.total_score, reverse=True)
+        
+        # Apply max_results limit
+        final_leads = scored_leads[:criteria.max_results]
+        
+        # Log metrics
+        self._log_scan_metrics(criteria, final_leads)
+        
+        return final_leads
     
     async def _get_raw_leads(self, criteria: ScanCriteria) -> List[tuple]:
         """Get raw leads from data source"""
@@ -1,24 +1,43 @@
-from typing import Dict, List, Optional, Literal, Tuple, Any
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Literal, Set, Tuple, Any, NamedTuple
+from datetime import datetime, timezone
 from pydantic import BaseModel, validator
 import logging
 import uuid
 import re
 import random
+import secrets
 import json
+import string
 import sys
 import os
+import time
 import asyncio
-from collections import defaultdict
+import functools
+import hashlib
+import html
+import importlib
+from collections import defaultdict, OrderedDict
+from types import MappingProxyType
 
 # Add ai_engines to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
-from .email_templates import EmailTemplateLibrary, ToneStyle, EmailTemplate
+from .email_templates import EmailTemplateLibrary, ToneStyle, EmailTemplate, fill_template
 from ai_engines.base_engine import BaseAIEngine, AIEngineConfig
 from ai_engines.anthropic_engine import AnthropicEngine
 from ai_engines.mock_engine import MockAIEngine
 
+# orjson parses AI JSON responses and encodes tracking payloads faster; fall
+# back to the stdlib if absent. Redis accepts either bytes or str values, and
+# both encoders emit the same compact separators to keep stored values small.
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = functools.partial(json.dumps, separators=(",", ":"))
+
 # Import Lead from lead scanner
 try:
     from lead_scanner_implementation import Lead
@@ -30,18 +49,707 @@ except ImportError:
             for key, value in kwargs.items():
                 setattr(self, key, value)
 
-# Import Gmail integration
-try:
-    from integrations.gmail_integration import GmailIntegration, EmailMessage, EmailRecipient
-    from integrations.supabase_auth_manager import SupabaseAuthManager
-    import redis.asyncio as redis
-except ImportError:
-    # Fallback for testing
-    GmailIntegration = None
-    EmailMessage = None
-    EmailRecipient = None
-    SupabaseAuthManager = None
-    redis = None
+# Gmail integration is imported lazily (see _load_gmail_dependencies) so that
+# template-only use never pays for redis, google-auth and Supabase imports.
+GmailIntegration = None
+EmailMessage = None
+EmailRecipient = None
+SupabaseAuthManager = None
+redis = None
+
+
+def _load_gmail_dependencies() -> bool:
+    """Import the Gmail/Supabase/Redis stack on first use; False if unavailable"""
+    global GmailIntegration, EmailMessage, EmailRecipient, SupabaseAuthManager, redis
+
+    if GmailIntegration is not None:
+        return True
+    try:
+        gmail_integration = importlib.import_module("integrations.gmail_integration")
+        supabase_auth_manager = importlib.import_module("integrations.supabase_auth_manager")
+        redis = importlib.import_module("redis.asyncio")
+    except ImportError:
+        return False
+
+    EmailMessage = gmail_integration.EmailMessage
+    EmailRecipient = gmail_integration.EmailRecipient
+    SupabaseAuthManager = supabase_auth_manager.SupabaseAuthManager
+    GmailIntegration = gmail_integration.GmailIntegration
+    return True
+
+
+# Process-wide shared resources. The template library is read-only after
+# loading; real AI engines hold HTTP clients and response caches, so agents
+# with the same provider/model/key reuse one instance; close_cached_engines()
+# releases them at shutdown. Mock engines stay per-agent because callers tune
+# their delay and failure rate.
+_TEMPLATE_LIBRARY: Optional[EmailTemplateLibrary] = None
+_FALLBACK_UNSUBSCRIBE_KEY: Optional[bytes] = None
+_AI_ENGINE_CACHE: Dict[Tuple[str, str, Optional[str]], BaseAIEngine] = {}
+
+
+def _get_template_library() -> EmailTemplateLibrary:
+    """Return the shared template library, loading it on first use"""
+    global _TEMPLATE_LIBRARY
+
+    if _TEMPLATE_LIBRARY is None:
+        _TEMPLATE_LIBRARY = EmailTemplateLibrary()
+    return _TEMPLATE_LIBRARY
+
+
+def _get_fallback_unsubscribe_key() -> bytes:
+    """Return a random unsubscribe key for this process, warning once when it is created"""
+    global _FALLBACK_UNSUBSCRIBE_KEY
+
+    if _FALLBACK_UNSUBSCRIBE_KEY is None:
+        logging.getLogger(__name__).warning(
+            "No unsubscribe secret set; unsubscribe tokens use a random per-process key "
+            "and cannot be verified by other processes"
+        )
+        _FALLBACK_UNSUBSCRIBE_KEY = secrets.token_bytes(32)
+    return _FALLBACK_UNSUBSCRIBE_KEY
+
+
+async def close_cached_engines():
+    """Close and forget the shared AI engines; call once at shutdown, after the agents using them"""
+    engines = list(_AI_ENGINE_CACHE.values())
+    _AI_ENGINE_CACHE.clear()
+    for engine in engines:
+        engine_close = getattr(engine, "aclose", None)
+        if engine_close is not None:
+            await engine_close()
+
+# Prompt skeletons: static instructions come first so the prefix is identical
+# across leads and emails and can be served from the AI engine's prompt cache.
+# The compose prompt is split so the instructions, sender and style block is
+# rendered once per sender/config and only the recipient part per lead.
+_COMPOSE_PROMPT_PREFIX_TMPL = string.Template("""Write a personalized B2B sales email for the recipient described below.
+
+REQUIREMENTS:
+- Reference specific recent news or pain point
+- Include clear value proposition
+- End with soft call-to-action
+- Make it feel personal, not templated
+
+Generate both subject line and email body. Format as:
+SUBJECT: [subject line]
+BODY: [email body]
+
+SENDER:
+Name: $sender_name
+Title: $sender_title
+Company: $sender_company
+Value Proposition: $value_proposition
+
+STYLE:
+- Tone: $tone
+- Length: $max_length words maximum
+
+""")
+
+_COMPOSE_PROMPT_LEAD_TMPL = string.Template("""RECIPIENT:
+Name: $name
+Title: $title
+Company: $company
+Industry: $industry
+Company Size: $employee_count employees
+
+INSIGHTS:
+Recent News: $recent_news
+Pain Points: $pain_points
+AI Analysis: $ai_insights""")
+
+_VARIATIONS_PROMPT_TMPL = string.Template("""Generate 2 alternative versions of the email below with different angles.
+
+Create variations that:
+1. First variation: Focus more on ROI and business impact
+2. Second variation: Focus more on innovation and competitive advantage
+
+Keep the same general length and tone. Format each as:
+VARIATION 1:
+SUBJECT: [subject]
+BODY: [body]
+
+VARIATION 2:
+SUBJECT: [subject]
+BODY: [body]
+
+CONTEXT:
+- Recipient: $title at $company
+- Industry: $industry
+
+ORIGINAL SUBJECT: $subject
+ORIGINAL BODY: $body""")
+
+_RESPONSE_RATE_PROMPT_TMPL = string.Template("""Analyze the sales email below and predict the likelihood of a response (0.0-1.0).
+
+Consider these factors:
+1. Subject line effectiveness (compelling, relevant, not spammy)
+2. Opening line quality (personalized, relevant)
+3. Value proposition clarity
+4. Call-to-action strength (clear but not pushy)
+5. Overall length and readability
+6. Personalization depth
+
+Provide:
+- Response probability (0.0-1.0)
+- Key strengths (2-3 points)
+- Key weaknesses (2-3 points)
+- One improvement suggestion
+
+Format as JSON with keys: probability, strengths, weaknesses, improvement
+
+RECIPIENT:
+Title: $title
+Seniority: $seniority
+Industry: $industry
+Company Size: $employee_count
+Lead Score: $lead_score/100
+
+EMAIL:
+Subject: $subject
+Body: $body""")
+
+_RESPONSE_RATE_BATCH_PROMPT_TMPL = string.Template("""Analyze each sales email below and predict the likelihood of a response (0.0-1.0).
+
+Consider these factors:
+1. Subject line effectiveness (compelling, relevant, not spammy)
+2. Opening line quality (personalized, relevant)
+3. Value proposition clarity
+4. Call-to-action strength (clear but not pushy)
+5. Overall length and readability
+6. Personalization depth
+
+Format as a JSON array with exactly $count objects, one per email in the
+order given, each with keys: probability, strengths, weaknesses, improvement
+
+$emails""")
+
+_RESPONSE_RATE_BATCH_ITEM_TMPL = string.Template("""EMAIL $index:
+Recipient: $title ($seniority), $industry, $employee_count employees
+Lead Score: $lead_score/100
+Subject: $subject
+Body: $body""")
+
+# Sender details used in AI prompts when the config leaves them out
+_SENDER_DEFAULTS = MappingProxyType({
+    "name": "Sales Representative",
+    "title": "Account Executive",
+    "company": "Our Company",
+    "value_proposition": "Help companies grow efficiently"
+})
+
+# Phrase swaps for synthetic A/B variations, applied in a single regex pass
+_SYNTHETIC_SUBJECT_RE = re.compile(r"Quick question|Partnership")
+_SYNTHETIC_BODY_RE = re.compile(r"I noticed|growth|discuss")
+_SYNTHETIC_VARIATIONS = (
+    ("B",
+     {"Quick question": "ROI opportunity", "Partnership": "Revenue growth"},
+     {"I noticed": "I saw that", "growth": "increase revenue by 25%", "discuss": "explore the ROI potential"}),
+    ("C",
+     {"Quick question": "Innovation opportunity", "Partnership": "Competitive advantage"},
+     {"I noticed": "I came across", "growth": "stay ahead of competitors", "discuss": "explore innovative solutions"}),
+)
+
+# Personalization data
+_COMPANY_ACHIEVEMENTS = MappingProxyType({
+    "SaaS": ("raised Series A", "launched new product", "expanded internationally", "acquired competitor"),
+    "FinTech": ("achieved SOC2 compliance", "raised funding", "launched mobile app", "expanded to new markets"),
+    "E-commerce": ("increased sales by 50%", "launched new product line", "expanded to new regions", "improved customer satisfaction"),
+    "Healthcare": ("received FDA approval", "expanded services", "improved patient outcomes", "adopted new technology"),
+    "Manufacturing": ("automated production line", "increased efficiency", "expanded capacity", "reduced waste")
+})
+
+_PAIN_POINTS_MAPPING = MappingProxyType({
+    "SaaS": ("customer churn", "scaling infrastructure", "product adoption", "user onboarding"),
+    "FinTech": ("regulatory compliance", "fraud prevention", "security", "transaction processing"),
+    "E-commerce": ("cart abandonment", "customer retention", "inventory management", "shipping costs"),
+    "Healthcare": ("patient engagement", "data security", "regulatory compliance", "operational efficiency"),
+    "Manufacturing": ("production efficiency", "quality control", "supply chain", "predictive maintenance")
+})
+
+# Industry-specific insights
+_INDUSTRY_INSIGHTS = MappingProxyType({
+    "SaaS": MappingProxyType({
+        "trends": ("AI integration", "customer success automation", "product-led growth"),
+        "challenges": ("customer acquisition cost", "retention rates", "feature adoption"),
+        "success_metrics": ("ARR growth", "churn reduction", "NPS improvement")
+    }),
+    "FinTech": MappingProxyType({
+        "trends": ("open banking", "blockchain adoption", "regulatory technology"),
+        "challenges": ("compliance costs", "security threats", "customer trust"),
+        "success_metrics": ("transaction volume", "fraud reduction", "compliance score")
+    }),
+    "E-commerce": MappingProxyType({
+        "trends": ("mobile commerce", "personalization", "social commerce"),
+        "challenges": ("competition", "customer acquisition", "logistics"),
+        "success_metrics": ("conversion rate", "average order value", "customer lifetime value")
+    }),
+    "Healthcare": MappingProxyType({
+        "trends": ("telemedicine", "AI diagnostics", "patient portals"),
+        "challenges": ("regulatory compliance", "data privacy", "patient engagement"),
+        "success_metrics": ("patient satisfaction", "clinical outcomes", "operational efficiency")
+    }),
+    "Manufacturing": MappingProxyType({
+        "trends": ("Industry 4.0", "predictive maintenance", "supply chain visibility"),
+        "challenges": ("digital transformation", "skilled workforce", "sustainability"),
+        "success_metrics": ("OEE improvement", "cost reduction", "quality metrics")
+    })
+})
+
+
+class IndustryProfile(NamedTuple):
+    """Everything the composer knows about one industry, fetched in one lookup"""
+    achievements: Tuple[str, ...]
+    pain_points: Tuple[str, ...]
+    trends: Tuple[str, ...]
+    challenges: Tuple[str, ...]
+    success_metrics: Tuple[str, ...]
+
+
+_INDUSTRY_PROFILES = MappingProxyType({
+    industry: IndustryProfile(
+        achievements=_COMPANY_ACHIEVEMENTS[industry],
+        pain_points=_PAIN_POINTS_MAPPING[industry],
+        trends=_INDUSTRY_INSIGHTS[industry]["trends"],
+        challenges=_INDUSTRY_INSIGHTS[industry]["challenges"],
+        success_metrics=_INDUSTRY_INSIGHTS[industry]["success_metrics"]
+    )
+    for industry in _COMPANY_ACHIEVEMENTS
+})
+
+# Fallback for industries without a profile; no insights means no P.S. line
+_DEFAULT_INDUSTRY_PROFILE = IndustryProfile(
+    achievements=("has been growing rapidly",),
+    pain_points=("operational efficiency",),
+    trends=(),
+    challenges=(),
+    success_metrics=()
+)
+
+# Response rate prediction model weights
+_RESPONSE_RATE_FACTORS = MappingProxyType({
+    "personalization_score": 0.35,
+    "subject_line_quality": 0.25,
+    "message_length": 0.15,
+    "lead_score": 0.15,
+    "timing": 0.10
+})
+
+# Similar companies to name-drop, per industry (simplified - would use actual database lookup)
+_INDUSTRY_COMPANIES = MappingProxyType({
+    "SaaS": ("Salesforce", "HubSpot", "Zendesk"),
+    "FinTech": ("Stripe", "Square", "Plaid"),
+    "E-commerce": ("Shopify", "BigCommerce", "Magento"),
+    "Healthcare": ("Epic", "Cerner", "Veracyte"),
+    "Manufacturing": ("GE", "Siemens", "Honeywell")
+})
+
+# Specific result based on pain point
+_RESULTS_MAPPING = MappingProxyType({
+    "customer churn": "reduce churn by 30%",
+    "scaling infrastructure": "scale 10x without downtime",
+    "regulatory compliance": "achieve compliance 50% faster",
+    "cart abandonment": "recover 25% of abandoned carts",
+    "production efficiency": "increase efficiency by 35%"
+})
+
+# Value proposition per industry
+_VALUE_PROPS = MappingProxyType({
+    "SaaS": "increase customer retention and reduce churn",
+    "FinTech": "streamline compliance and enhance security",
+    "E-commerce": "boost conversions and customer lifetime value",
+    "Healthcare": "improve patient outcomes and operational efficiency",
+    "Manufacturing": "optimize production and reduce costs"
+})
+
+# Baseline industry response rates
+_INDUSTRY_RATES = MappingProxyType({
+    "SaaS": 0.18,
+    "FinTech": 0.12,
+    "E-commerce": 0.15,
+    "Healthcare": 0.10,
+    "Manufacturing": 0.08
+})
+
+# Industry-specific terminology that signals personalization
+_INDUSTRY_TERMS = MappingProxyType({
+    "SaaS": ("churn", "ARR", "MRR", "onboarding", "activation"),
+    "FinTech": ("compliance", "security", "fraud", "transaction", "regulatory"),
+    "E-commerce": ("conversion", "cart", "checkout", "fulfillment", "retention"),
+    "Healthcare": ("patient", "HIPAA", "clinical", "outcomes", "care"),
+    "Manufacturing": ("production", "efficiency", "quality", "automation", "supply chain")
+})
+
+# The same terms as scoring needles against lowercased text. Mixed-case
+# acronyms (ARR, MRR, HIPAA) can never occur in lowercased text, so they
+# are dropped here rather than scanned for on every message.
+_INDUSTRY_TERM_NEEDLES = MappingProxyType({
+    industry: tuple(term for term in terms if term == term.lower())
+    for industry, terms in _INDUSTRY_TERMS.items()
+})
+
+# AI response-rate predictions: in-process LRU size and shared Redis TTL
+_RATE_CACHE_SIZE = 1024
+_RATE_CACHE_TTL = 86400
+
+# Most concurrent response-rate predictions coalesced into one AI call when
+# the agent is configured with an ai_batch_window_ms
+_RATE_BATCH_SIZE = 16
+
+# get_email_status results kept per agent so polling skips Redis and Gmail
+_STATUS_CACHE_SIZE = 1024
+_STATUS_CACHE_TTL = 30
+
+# Heuristic response scores memoized process-wide; variants and repeated
+# predictions re-score identical (message, lead) inputs
+_HEURISTIC_CACHE_SIZE = 4096
+
+# Per-lead personalization variables and scoring needles kept in each agent's LRU
+_VAR_CACHE_SIZE = 1024
+
+# Random bytes drawn per refill of an agent's UUID pool (512 UUIDs)
+_UUID_POOL_BYTES = 8192
+
+# Redis lifetimes, in seconds, of per-message tracking and per-lead history
+_TRACKING_TTL = 30 * 86400
+_HISTORY_TTL = 90 * 86400
+
+# Upper bound on pooled Redis connections per agent
+_REDIS_MAX_CONNECTIONS = 64
+
+# Background tracking writes: queued entries before senders wait, and the
+# most entries flushed to Redis in one pipeline
+_TRACKING_QUEUE_SIZE = 1000
+_TRACKING_BATCH_SIZE = 100
+
+# Add to a lead's email history, a sorted set scored by send time, keeping the
+# newest 50 entries and dropping those older than the cutoff, server-side in
+# one call. ARGV: entry, sent-at timestamp, cutoff timestamp, key TTL, UTC
+# offset of the naive sent_at strings in seconds. A list written by the earlier
+# LPUSH-based history is migrated first, each entry scored by its sent_at.
+_HISTORY_SCRIPT = """
+if redis.call('TYPE', KEYS[1]).ok == 'list' then
+    local entries = redis.call('LRANGE', KEYS[1], 0, -1)
+    redis.call('DEL', KEYS[1])
+    for _, raw in ipairs(entries) do
+        local ok, old = pcall(cjson.decode, raw)
+        local y, m, d, hh, mm, ss
+        if ok and type(old) == 'table' and type(old.sent_at) == 'string' then
+            y, m, d, hh, mm, ss = string.match(old.sent_at, '^(%d+)-(%d+)-(%d+)T(%d+):(%d+):(%d+)')
+        end
+        if y then
+            y, m, d = tonumber(y), tonumber(m), tonumber(d)
+            if m <= 2 then y = y - 1 end
+            local era = math.floor(y / 400)
+            local yoe = y - era * 400
+            local mp = (m + 9) % 12
+            local doe = yoe * 365 + math.floor(yoe / 4) - math.floor(yoe / 100) + math.floor((153 * mp + 2) / 5) + d - 1
+            local days = era * 146097 + doe - 719468
+            local score = days * 86400 + tonumber(hh) * 3600 + tonumber(mm) * 60 + tonumber(ss) - tonumber(ARGV[5])
+            redis.call('ZADD', KEYS[1], score, raw)
+        end
+    end
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -51)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+# SETEX every tracking key of a batch in one call; ARGV[1] is the TTL and
+# ARGV[i + 1] the payload for KEYS[i]
+_BULK_TRACKING_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    redis.call('SETEX', key, ARGV[1], ARGV[i + 1])
+end
+return #KEYS
+"""
+
+def _response_rate_core(
+    word_count: int,
+    personalization_score: float,
+    subject_words: int,
+    subject_is_question: bool,
+    lead_score: float,
+    industry_rate: float,
+    factors: Dict[str, float]
+) -> float:
+    """Numeric core of predict_response_rate, kept free of model access"""
+    base_rate = 0.15  # Base response rate
+
+    # Factor 1: Message length (optimal: 150-200 words)
+    if 150 <= word_count <= 200:
+        length_factor = 1.0
+    elif 100 <= word_count < 150 or 200 < word_count <= 250:
+        length_factor = 0.8
+    else:
+        length_factor = 0.6
+
+    # Factor 3: Subject line quality (simplified)
+    subject_quality = 0.8  # Default
+    if subject_words <= 8:
+        subject_quality = 0.9
+    if subject_is_question:
+        subject_quality += 0.1
+
+    # Factor 4: Lead score influence
+    lead_score_factor = min(lead_score / 100, 1.0)
+
+    # Combine factors (factor 2 is the personalization score itself,
+    # factor 5 the industry response rate)
+    predicted_rate = (
+        base_rate * 0.2 +
+        length_factor * factors["message_length"] +
+        personalization_score * factors["personalization_score"] +
+        subject_quality * factors["subject_line_quality"] +
+        lead_score_factor * factors["lead_score"] +
+        industry_rate * factors["timing"]
+    )
+
+    return min(predicted_rate, 1.0)
+
+
+# Keyword groups for the response-probability heuristic. Each group that
+# fires sets one bit in a feature mask consumed by _heuristic_response_score.
+_HF_SUBJECT_POSITIVE = 1 << 0
+_HF_SUBJECT_SPAM = 1 << 1
+_HF_BODY_QUALITY = 1 << 2
+_HF_BODY_CTA = 1 << 3
+_HF_FIRST_NAME = 1 << 4
+_HF_COMPANY = 1 << 5
+
+_SUBJECT_KEYWORD_GROUPS = (
+    (_HF_SUBJECT_POSITIVE, ("question", "opportunity", "partnership")),
+    (_HF_SUBJECT_SPAM, ("free", "guarantee", "urgent", "!!!"))
+)
+_BODY_KEYWORD_GROUPS = (
+    (_HF_BODY_QUALITY, ("noticed", "congratulations", "brief call", "discuss")),
+    (_HF_BODY_CTA, ("would you be", "are you interested"))
+)
+_BODY_SPAM_PHRASES = ("guarantee", "100%", "free", "limited time", "act now", "click here")
+
+# Keyword batteries for AI message quality checks. Plain substring tests are
+# deliberate: CPython's str search beats a compiled regex union of the same
+# terms by ~3x on typical message bodies, and the spam score needs every
+# distinct trigger, which a single alternation scan would under-count
+_CTA_PHRASES = ("call", "meeting", "discuss", "chat", "connect", "schedule")
+_UNPROFESSIONAL_PHRASES = (
+    "guarantee success", "100% guaranteed", "no risk", "act now",
+    "limited time", "once in a lifetime", "don't miss out", "urgent"
+)
+_SPAM_TRIGGERS = (
+    "free", "guarantee", "no obligation", "act now", "limited time",
+    "click here", "buy now", "special offer", "!!!!", "$$",
+    "100% guaranteed", "risk-free", "urgent", "winner"
+)
+_SENSITIVE_TERMS = (
+    "layoff", "fired", "bankruptcy", "lawsuit", "scandal",
+    "controversy", "failure", "crisis", "problem"
+)
+_FULL_NAME_RE = re.compile(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b')
+_KNOWN_ROLE_NAMES = ("Sales Representative", "Account Executive")
+
+# A/B variant labels: subject variants use A-C, CTA variants D-F
+_VARIANT_LETTERS = ("A", "B", "C", "D", "E", "F")
+_CTA_VARIATIONS = (
+    "Would you be open to a brief 15-minute call?",
+    "Worth a quick chat to explore this?",
+    "Available for a brief conversation this week?"
+)
+
+# Characters html.escape would rewrite
+_HTML_SPECIAL_RE = re.compile(r"[&<>\"']")
+
+# Full HTML email wrapper used by _convert_to_html; $-placeholders avoid
+# escaping every CSS brace
+_EMAIL_HTML_TEMPLATE = string.Template("""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1">
+            <title>$company_name - Outreach</title>
+            <style>
+                body {
+                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Arial, sans-serif;
+                    line-height: 1.6;
+                    color: #333;
+                    margin: 0;
+                    padding: 20px;
+                    background-color: #f9f9f9;
+                }
+                .email-container {
+                    max-width: 600px;
+                    margin: 0 auto;
+                    background-color: white;
+                    padding: 30px;
+                    border-radius: 8px;
+                    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+                }
+                .email-header {
+                    border-bottom: 2px solid #f0f0f0;
+                    padding-bottom: 20px;
+                    margin-bottom: 30px;
+                }
+                .email-content {
+                    font-size: 16px;
+                    line-height: 1.7;
+                }
+                .email-content p {
+                    margin: 0 0 20px 0;
+                }
+                .email-footer {
+                    margin-top: 40px;
+                    padding-top: 20px;
+                    border-top: 1px solid #eee;
+                    font-size: 14px;
+                    color: #666;
+                    text-align: center;
+                }
+                .signature {
+                    margin-top: 30px;
+                    padding-top: 20px;
+                    border-top: 1px solid #f0f0f0;
+                    font-size: 14px;
+                    color: #666;
+                }
+                a {
+                    color: #0066cc;
+                    text-decoration: none;
+                }
+                a:hover {
+                    text-decoration: underline;
+                }
+            </style>
+        </head>
+        <body>
+            <div class="email-container">
+                <div class="email-header">
+                    <h2 style="margin: 0; color: #333;">Personal Message for $first_name</h2>
+                </div>
+                
+                <div class="email-content">
+                    $html_body
+                </div>
+                
+                <div class="signature">
+                    $signature
+                </div>
+            </div>
+        </body>
+        </html>
+        """)
+
+# Sender signature inside the HTML wrapper; the sender is fixed per agent
+_SIGNATURE_HTML_TEMPLATE = string.Template("""<p><strong>$sender_name</strong><br>
+                    $sender_title<br>
+                    $sender_company<br>
+                    $sender_phone</p>""")
+
+
+def _keyword_mask(text_lower: str, groups: Tuple[Tuple[int, Tuple[str, ...]], ...]) -> int:
+    """OR together the bits of every keyword group with a term in the text"""
+    mask = 0
+    for bit, terms in groups:
+        for term in terms:
+            if term in text_lower:
+                mask |= bit
+                break
+    return mask
+
+
+def _heuristic_response_score(
+    lead_score: float,
+    subject_len: int,
+    word_count: int,
+    flags: int,
+    spam_count: int,
+    exclamations: int,
+    caps_ratio: float
+) -> float:
+    """
+    Numeric core of the response heuristic, kept free of string handling.
+    
+    A handful of scalar branches, memoized by _cached_response_heuristic;
+    a JIT dispatch per call would cost more than the arithmetic it replaces.
+    """
+    score = 0.3  # Lower base score
+
+    # Lead quality bonus (reduced impact)
+    score += (lead_score / 100) * 0.2
+
+    # Subject line quality
+    if 30 < subject_len < 60:  # Optimal length
+        score += 0.1
+    if flags & _HF_SUBJECT_POSITIVE:
+        score += 0.05
+    if flags & _HF_SUBJECT_SPAM:
+        score -= 0.2
+
+    # Body quality
+    if 50 < word_count < 150:  # Optimal length
+        score += 0.15
+    elif word_count > 200:  # Too long
+        score -= 0.1
+    elif word_count < 30:  # Too short
+        score -= 0.1
+
+    # Personalization (higher weight)
+    if flags & _HF_FIRST_NAME:
+        score += 0.15
+    if flags & _HF_COMPANY:
+        score += 0.1
+
+    # Professional quality indicators
+    if flags & _HF_BODY_QUALITY:
+        score += 0.1
+    if flags & _HF_BODY_CTA:
+        score += 0.05
+
+    # Negative quality indicators
+    score -= spam_count * 0.1
+
+    # Excessive punctuation or caps
+    if exclamations > 2:
+        score -= 0.1
+    if caps_ratio > 0.1:
+        score -= 0.15
+
+    return min(0.9, max(0.05, score))
+
+
+@functools.lru_cache(maxsize=_HEURISTIC_CACHE_SIZE)
+def _cached_response_heuristic(
+    subject: str,
+    body: str,
+    first_name: str,
+    company_name: str,
+    lead_score: float
+) -> float:
+    """Scan a message for heuristic features and score it, memoized per input"""
+    body_lower = body.lower()
+    caps_ratio = sum(map(str.isupper, body)) / max(1, len(body))
+
+    flags = (
+        _keyword_mask(subject.lower(), _SUBJECT_KEYWORD_GROUPS)
+        | _keyword_mask(body_lower, _BODY_KEYWORD_GROUPS)
+    )
+    if first_name in body:
+        flags |= _HF_FIRST_NAME
+    if company_name in body:
+        flags |= _HF_COMPANY
+
+    return _heuristic_response_score(
+        lead_score,
+        len(subject),
+        len(body.split()),
+        flags,
+        sum(1 for phrase in _BODY_SPAM_PHRASES if phrase in body_lower),
+        body.count("!"),
+        caps_ratio
+    )
 
 
 class OutreachMessage(BaseModel):
@@ -84,29 +792,133 @@ class OutreachConfig(BaseModel):
 
 
 class OutreachComposerAgent:
-    def __init__(self, mode: Literal["template", "ai", "hybrid"] = "template", config: Optional[Dict] = None):
+    # Shared, read-only lookup tables (see module-level definitions)
+    company_achievements = _COMPANY_ACHIEVEMENTS
+    pain_points_mapping = _PAIN_POINTS_MAPPING
+    industry_insights = _INDUSTRY_INSIGHTS
+    response_rate_factors = _RESPONSE_RATE_FACTORS
+
+    def __init__(
+        self,
+        mode: Literal["template", "ai", "hybrid"] = "template",
+        config: Optional[Dict] = None,
+        ai_engine: Optional[BaseAIEngine] = None
+    ):
         self.mode = mode
         self.config = config or {}
-        self.template_library = EmailTemplateLibrary()
+        self.template_library = _get_template_library()
         self.logger = logging.getLogger(__name__)
-        self._setup_personalization_data()
-        self._setup_industry_insights()
-        self._setup_response_rate_model()
+        self.prediction_feedback: List[Dict] = []
+        self._rate_cache: "OrderedDict[str, float]" = OrderedDict()
+        self._status_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._var_cache: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._needle_cache: "OrderedDict[str, Tuple]" = OrderedDict()
+        self._template_choice_cache: Dict[Tuple, str] = {}
+        self._prompt_prefix_cache: Dict[Tuple, str] = {}
+        self._uuid_pool = b""
+        self._uuid_offset = 0
+        
+        # Response-rate predictions waiting for the current batch window
+        self._rate_batch_window = self.config.get('ai_batch_window_ms', 0) / 1000
+        self._rate_batch_size = self.config.get('ai_batch_size', _RATE_BATCH_SIZE)
+        self._pending_rates: List[Tuple[Dict, Lead, asyncio.Future]] = []
+        self._rate_flush_handle: Optional[asyncio.TimerHandle] = None
+        self._rate_batch_tasks: Set[asyncio.Task] = set()
+        
+        # Sender details come from config, which is fixed for the agent's lifetime
+        self._signature_html = _SIGNATURE_HTML_TEMPLATE.substitute(
+            sender_name=self.config.get('sender_name', 'Sales Team'),
+            sender_title=self.config.get('sender_title', 'Account Executive'),
+            sender_company=self.config.get('sender_company', 'Our Company'),
+            sender_phone=self.config.get('sender_phone', '')
+        )
+        self._unsubscribe_base_url = self.config.get('base_url', 'https://localhost:8000')
+        unsubscribe_secret = self.config.get('unsubscribe_secret', os.getenv('UNSUBSCRIBE_SECRET'))
+        if unsubscribe_secret:
+            # BLAKE2b keys are capped at 64 bytes, so hash secrets of any length to a fixed-size key
+            self._unsubscribe_key: Optional[bytes] = hashlib.blake2b(unsubscribe_secret.encode(), digest_size=32).digest()
+        elif self.config.get('gmail_enabled', False):
+            # Sent links must stay verifiable across restarts and processes
+            raise ValueError("unsubscribe_secret or UNSUBSCRIBE_SECRET is required when gmail_enabled is set")
+        else:
+            self._unsubscribe_key = None  # Per-process random key, taken on first use
         
-        # Initialize AI engine for ai/hybrid modes
+        # Initialize AI engine for ai/hybrid modes. Injected engines and
+        # engines from the process-wide cache are shared, so aclose() leaves
+        # them open; only an engine created just for this agent is owned.
         self.ai_engine = None
+        self._owns_ai_engine = False
         if mode in ["ai", "hybrid"]:
-            self._initialize_ai_engine()
+            if ai_engine is not None:
+                self.ai_engine = ai_engine
+            else:
+                self._initialize_ai_engine()
         
         # Initialize Gmail integration
         self.gmail_client = None
         self.auth_manager = None
         self.redis_client = None
+        self._owns_redis = False  # Only a client opened by _initialize_gmail is closed by aclose()
+        self._history_script = None
+        self._bulk_tracking_script = None
+        self._tracking_queue: Optional[asyncio.Queue] = None
+        self._tracking_worker: Optional[asyncio.Task] = None
         self.user_id = config.get('user_id') if config else None
         self.gmail_enabled = config.get('gmail_enabled', False) if config else False
+
+    @classmethod
+    async def create(
+        cls,
+        mode: Literal["template", "ai", "hybrid"] = "template",
+        config: Optional[Dict] = None,
+        ai_engine: Optional[BaseAIEngine] = None
+    ) -> "OutreachComposerAgent":
+        """Construct an agent and run its async setup"""
+        agent = cls(mode=mode, config=config, ai_engine=ai_engine)
+        await agent.start()
+        return agent
+
+    async def start(self):
+        """
+        Run async setup once, before the first send.
+        
+        Gmail, Redis and Supabase connections are established here rather than
+        in __init__, so construction needs no running event loop and the first
+        compose calls never race a half-finished integration.
+        """
+        if self.gmail_enabled and _load_gmail_dependencies():
+            await self._initialize_gmail()
+        
+        # Tracking writes are not needed for a send to succeed, so they are
+        # flushed to Redis in the background rather than on the send path
+        if self.redis_client and self._tracking_worker is None:
+            self._tracking_queue = asyncio.Queue(maxsize=_TRACKING_QUEUE_SIZE)
+            self._tracking_worker = asyncio.create_task(self._tracking_consumer())
+    
+    async def stop(self):
+        """Flush queued tracking writes and stop the background worker"""
+        if self._tracking_worker is None:
+            return
         
-        if self.gmail_enabled and GmailIntegration:
-            asyncio.create_task(self._initialize_gmail())
+        await self._tracking_queue.join()
+        self._tracking_worker.cancel()
+        try:
+            await self._tracking_worker
+        except asyncio.CancelledError:
+            pass
+        self._tracking_worker = None
+        self._tracking_queue = None
+    
+    async def aclose(self):
+        """Flush background work and release the agent's Redis and HTTP connections"""
+        await self.stop()
+        if self.redis_client is not None and self._owns_redis:
+            await self.redis_client.aclose()
+            self.redis_client = None
+            self._owns_redis = False
+        engine_close = getattr(self.ai_engine, "aclose", None) if self._owns_ai_engine else None
+        if engine_close is not None:
+            await engine_close()
             
     def _initialize_ai_engine(self):
         """Initialize AI engine"""
@@ -120,18 +932,33 @@ class OutreachComposerAgent:
         
         ai_provider = self.config.get("ai_provider", "mock")
         if ai_provider == "anthropic" and ai_config.api_key:
-            self.ai_engine = AnthropicEngine(ai_config)
-            self.logger.info("Initialized Anthropic AI engine for outreach")
+            cache_key = (ai_provider, ai_config.model, ai_config.api_key)
+            self.ai_engine = _AI_ENGINE_CACHE.get(cache_key)
+            if self.ai_engine is None:
+                self.ai_engine = AnthropicEngine(ai_config)
+                _AI_ENGINE_CACHE[cache_key] = self.ai_engine
+                self.logger.info("Initialized Anthropic AI engine for outreach")
         else:
             self.ai_engine = MockAIEngine(ai_config, deterministic=False)
+            self._owns_ai_engine = True
             self.logger.info("Initialized Mock AI engine for outreach")
     
     async def _initialize_gmail(self):
         """Initialize Gmail integration with credentials from Supabase"""
         try:
-            # Initialize Redis for queue management
-            redis_url = self.config.get('redis_url', 'redis://localhost:6379')
-            self.redis_client = await redis.from_url(redis_url)
+            # Initialize Redis for queue management. One bounded pool serves
+            # every send and tracking write; a UNIX socket skips TCP when Redis
+            # runs on the same host.
+            redis_socket = self.config.get('redis_unix_socket')
+            if redis_socket:
+                self.redis_client = await redis.Redis(
+                    unix_socket_path=redis_socket,
+                    max_connections=_REDIS_MAX_CONNECTIONS
+                )
+            else:
+                redis_url = self.config.get('redis_url', 'redis://localhost:6379')
+                self.redis_client = await redis.from_url(redis_url, max_connections=_REDIS_MAX_CONNECTIONS)
+            self._owns_redis = True
             
             # Initialize auth manager
             self.auth_manager = SupabaseAuthManager(
@@ -180,71 +1007,87 @@ class OutreachComposerAgent:
             self.logger.error(f"Failed to initialize Gmail: {e}")
             self.gmail_enabled = False
 
-    def _setup_personalization_data(self):
-        """Setup data for personalization"""
-        self.company_achievements = {
-            "SaaS": ["raised Series A", "launched new product", "expanded internationally", "acquired competitor"],
-            "FinTech": ["achieved SOC2 compliance", "raised funding", "launched mobile app", "expanded to new markets"],
-            "E-commerce": ["increased sales by 50%", "launched new product line", "expanded to new regions", "improved customer satisfaction"],
-            "Healthcare": ["received FDA approval", "expanded services", "improved patient outcomes", "adopted new technology"],
-            "Manufacturing": ["automated production line", "increased efficiency", "expanded capacity", "reduced waste"]
-        }
+    def _next_uuid(self) -> uuid.UUID:
+        """Version-4 UUID carved from a pooled os.urandom draw"""
+        if self._uuid_offset >= len(self._uuid_pool):
+            self._uuid_pool = os.urandom(_UUID_POOL_BYTES)
+            self._uuid_offset = 0
+        raw = bytearray(self._uuid_pool[self._uuid_offset:self._uuid_offset + 16])
+        self._uuid_offset += 16
+        raw[6] = (raw[6] & 0x0F) | 0x40
+        raw[8] = (raw[8] & 0x3F) | 0x80
+        return uuid.UUID(bytes=bytes(raw))
+
+    def compose_outreach_sync(self, lead: Lead, config: OutreachConfig, now: Optional[datetime] = None) -> OutreachMessage:
+        """
+        Compose message synchronously (template mode only).
         
-        self.pain_points_mapping = {
-            "SaaS": ["customer churn", "scaling infrastructure", "product adoption", "user onboarding"],
-            "FinTech": ["regulatory compliance", "fraud prevention", "security", "transaction processing"],
-            "E-commerce": ["cart abandonment", "customer retention", "inventory management", "shipping costs"],
-            "Healthcare": ["patient engagement", "data security", "regulatory compliance", "operational efficiency"],
-            "Manufacturing": ["production efficiency", "quality control", "supply chain", "predictive maintenance"]
-        }
+        Template composition never awaits, so bulk template-mode callers can
+        skip the coroutine and event-loop overhead of compose_outreach.
+        """
+        if self.mode != "template":
+            raise ValueError(f"compose_outreach_sync requires template mode, got: {self.mode}")
+        return self._compose_template_sync(lead, config, now)
 
-    def _setup_industry_insights(self):
-        """Setup industry-specific insights"""
-        self.industry_insights = {
-            "SaaS": {
-                "trends": ["AI integration", "customer success automation", "product-led growth"],
-                "challenges": ["customer acquisition cost", "retention rates", "feature adoption"],
-                "success_metrics": ["ARR growth", "churn reduction", "NPS improvement"]
-            },
-            "FinTech": {
-                "trends": ["open banking", "blockchain adoption", "regulatory technology"],
-                "challenges": ["compliance costs", "security threats", "customer trust"],
-                "success_metrics": ["transaction volume", "fraud reduction", "compliance score"]
-            },
-            "E-commerce": {
-                "trends": ["mobile commerce", "personalization", "social commerce"],
-                "challenges": ["competition", "customer acquisition", "logistics"],
-                "success_metrics": ["conversion rate", "average order value", "customer lifetime value"]
-            },
-            "Healthcare": {
-                "trends": ["telemedicine", "AI diagnostics", "patient portals"],
-                "challenges": ["regulatory compliance", "data privacy", "patient engagement"],
-                "success_metrics": ["patient satisfaction", "clinical outcomes", "operational efficiency"]
-            },
-            "Manufacturing": {
-                "trends": ["Industry 4.0", "predictive maintenance", "supply chain visibility"],
-                "challenges": ["digital transformation", "skilled workforce", "sustainability"],
-                "success_metrics": ["OEE improvement", "cost reduction", "quality metrics"]
-            }
-        }
+    async def compose_batch(
+        self,
+        leads: List[Lead],
+        config: OutreachConfig,
+        max_concurrency: Optional[int] = None
+    ) -> List[OutreachMessage]:
+        """
+        Compose messages for many leads, in input order.
+        
+        The whole batch shares one creation timestamp. Template mode runs
+        synchronously with no per-lead coroutine; AI and hybrid modes compose
+        concurrently so AI latency overlaps across leads, with at most
+        max_concurrency compositions in flight when a cap is given.
+        """
+        now = datetime.now()
+        if self.mode == "template":
+            return [self._compose_template_sync(lead, config, now) for lead in leads]
+        if max_concurrency is None:
+            return list(await asyncio.gather(*(self.compose_outreach(lead, config, now) for lead in leads)))
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def compose_one(lead: Lead) -> OutreachMessage:
+            async with semaphore:
+                return await self.compose_outreach(lead, config, now)
+        
+        return list(await asyncio.gather(*(compose_one(lead) for lead in leads)))
 
-    def _setup_response_rate_model(self):
-        """Setup response rate prediction model"""
-        self.response_rate_factors = {
-            "personalization_score": 0.35,
-            "subject_line_quality": 0.25,
-            "message_length": 0.15,
-            "lead_score": 0.15,
-            "timing": 0.10
-        }
+    def _compose_template_sync(
+        self,
+        lead: Lead,
+        config: OutreachConfig,
+        now: Optional[datetime] = None,
+        precomputed_vars: Optional[Dict[str, str]] = None
+    ) -> OutreachMessage:
+        """Select the best template and compose with it"""
+        template_id = self.select_template(lead, config)
+        return self._compose_with_template(lead, template_id, config, now, precomputed_vars)
 
-    async def compose_outreach(self, lead: Lead, config: OutreachConfig) -> OutreachMessage:
-        """Compose message with mode-specific logic"""
+    async def compose_outreach(
+        self,
+        lead: Lead,
+        config: OutreachConfig,
+        now: Optional[datetime] = None,
+        precomputed_vars: Optional[Dict[str, str]] = None
+    ) -> OutreachMessage:
+        """
+        Compose message with mode-specific logic.
+        
+        Batch callers can pass a shared `now` to stamp every message in the
+        batch with one timestamp instead of reading the clock per message.
+        Callers composing many messages for one lead can pass the lead's
+        `precomputed_vars` from _extract_personalization_variables; they are
+        read, never modified.
+        """
         
         if self.mode == "template":
             # Pure template mode
-            template_id = self.select_template(lead, config)
-            return self._compose_with_template(lead, template_id, config)
+            return self._compose_template_sync(lead, config, now, precomputed_vars)
             
         elif self.mode == "hybrid":
             # Use AI for high-value leads, templates for others
@@ -252,91 +1095,84 @@ class OutreachComposerAgent:
                 # High-value or AI-enriched lead - use AI
                 try:
                     # Check if AI engine is functional first
-                    if self.ai_engine and hasattr(self.ai_engine, 'failure_rate') and self.ai_engine.failure_rate >= 1.0:
+                    if self.ai_engine and getattr(self.ai_engine, 'failure_rate', 0.0) >= 1.0:
                         raise Exception("AI engine failure rate is 100%")
                     
-                    message = await self._compose_with_ai(lead, {}, config)
+                    message = await self._compose_with_ai(lead, {}, config, now, precomputed_vars)
                     # Ensure generation_mode is set correctly
                     message.generation_mode = "ai"
                     return message
                 except Exception as e:
                     self.logger.warning(f"AI generation failed, falling back to template: {e}")
-                    template_id = self.select_template(lead, config)
-                    message = self._compose_with_template(lead, template_id, config)
+                    message = self._compose_template_sync(lead, config, now, precomputed_vars)
                     # Ensure generation_mode is set correctly for fallback
                     message.generation_mode = "template"
                     return message
             else:
                 # Standard lead - use template
-                template_id = self.select_template(lead, config)
-                message = self._compose_with_template(lead, template_id, config)
+                message = self._compose_template_sync(lead, config, now, precomputed_vars)
                 message.generation_mode = "template"
                 return message
                 
         elif self.mode == "ai":
             # Full AI mode
-            return await self._compose_with_ai(lead, {}, config)
+            return await self._compose_with_ai(lead, {}, config, now, precomputed_vars)
             
         else:
             raise ValueError(f"Unknown mode: {self.mode}")
 
-    async def _compose_with_ai(self, lead: Lead, style_guide: Dict, config: OutreachConfig) -> OutreachMessage:
+    async def _compose_with_ai(
+        self,
+        lead: Lead,
+        style_guide: Dict,
+        config: OutreachConfig,
+        now: Optional[datetime] = None,
+        precomputed_vars: Optional[Dict[str, str]] = None
+    ) -> OutreachMessage:
         """Generate message using AI with deep personalization"""
         
         if not self.ai_engine:
             # Fallback to template
-            return self._compose_with_template(lead, "cold_outreach_formal_1", config)
+            return self._compose_with_enhanced_template(lead, style_guide, config, now, precomputed_vars)
         
         # Build comprehensive context
         context = self._build_ai_context(lead, config)
         
         # Generate message
-        prompt = f"""Write a personalized B2B sales email based on this context:
-
-RECIPIENT:
-Name: {lead.contact.full_name}
-Title: {lead.contact.title}
-Company: {lead.company.name}
-Industry: {lead.company.industry}
-Company Size: {lead.company.employee_count} employees
-
-INSIGHTS:
-Recent News: {context['recent_news']}
-Pain Points: {context['pain_points']}
-AI Analysis: {context['ai_insights']}
-
-SENDER:
-Name: {config.sender_info.get('name', 'Sales Representative')}
-Title: {config.sender_info.get('title', 'Account Executive')}
-Company: {config.sender_info.get('company', 'Our Company')}
-Value Proposition: {config.sender_info.get('value_proposition', 'Help companies grow efficiently')}
-
-REQUIREMENTS:
-- Tone: {config.tone or 'professional but friendly'}
-- Length: {config.max_length} words maximum
-- Reference specific recent news or pain point
-- Include clear value proposition
-- End with soft call-to-action
-- Make it feel personal, not templated
-
-Generate both subject line and email body. Format as:
-SUBJECT: [subject line]
-BODY: [email body]"""
+        prompt = self._compose_prompt_prefix(config) + _COMPOSE_PROMPT_LEAD_TMPL.substitute(
+            name=lead.contact.full_name,
+            title=lead.contact.title,
+            company=lead.company.name,
+            industry=lead.company.industry,
+            employee_count=lead.company.employee_count,
+            recent_news=context['recent_news'],
+            pain_points=context['pain_points'],
+            ai_insights=context['ai_insights']
+        )
 
         response = await self.ai_engine.generate(prompt)
         
-        # Parse response
-        subject, body = self._parse_ai_email(response.content)
-        
-        # Generate A/B variations
-        variations = await self._generate_ai_variations(lead, subject, body, config)
-        
-        # Select best variation
-        selected = variations[0]  # Could use more sophisticated selection
+        # Parse response; a reply without an email body falls back to the
+        # enhanced template rather than failing the lead
+        try:
+            subject, body = self._parse_ai_email(response.content)
+        except ValueError as e:
+            self.logger.warning(f"Unusable AI email, using enhanced template: {e}")
+            return self._compose_with_enhanced_template(lead, style_guide, config, now, precomputed_vars)
+        
+        # Select best variation. Variation A is always the base email, so it
+        # can be scored while the alternatives are generated.
+        selected = {"subject": subject, "body": body, "variant": "A"}  # Could use more sophisticated selection
+        
+        # Generate A/B variations and predict response rate concurrently
+        variations, predicted_response_rate = await asyncio.gather(
+            self._generate_ai_variations(lead, subject, body, config),
+            self._predict_response_rate_ai(selected, lead)
+        )
         
         # Create message object
         message = OutreachMessage(
-            message_id=f"msg_{uuid.uuid4()}",
+            message_id=f"msg_{self._next_uuid()}",
             lead_id=lead.lead_id,
             subject=selected["subject"],
             body=selected["body"],
@@ -344,10 +1180,10 @@ BODY: [email body]"""
             category=config.category,
             template_id=None,
             personalization_score=self.calculate_personalization_score(selected["body"], lead),
-            predicted_response_rate=await self._predict_response_rate_ai(selected, lead),
+            predicted_response_rate=predicted_response_rate,
             generation_mode="ai",
             ab_variant="A",
-            created_at=datetime.now(),
+            created_at=now or datetime.now(),
             metadata={
                 "ai_provider": self.ai_engine.get_engine_type(),
                 "ai_tokens": response.usage.get('total_tokens', 0),
@@ -363,40 +1199,64 @@ BODY: [email body]"""
         
         return message
     
+    def _compose_prompt_prefix(self, config: OutreachConfig) -> str:
+        """Render the lead-independent head of the compose prompt, once per sender and style"""
+        sender = {**_SENDER_DEFAULTS, **config.sender_info}
+        key = (
+            sender['name'], sender['title'], sender['company'], sender['value_proposition'],
+            config.tone, config.max_length
+        )
+        prefix = self._prompt_prefix_cache.get(key)
+        if prefix is None:
+            prefix = _COMPOSE_PROMPT_PREFIX_TMPL.substitute(
+                sender_name=sender['name'],
+                sender_title=sender['title'],
+                sender_company=sender['company'],
+                value_proposition=sender['value_proposition'],
+                tone=config.tone.value if config.tone else 'professional but friendly',
+                max_length=config.max_length
+            )
+            self._prompt_prefix_cache[key] = prefix
+        return prefix
+    
     def _build_ai_context(self, lead: Lead, config: OutreachConfig) -> Dict:
         """Build comprehensive context for AI"""
+        # Optional lead attributes, looked up once
+        pain_points = getattr(lead.company, 'pain_points', None)
+        recent_news = getattr(lead.company, 'recent_news', None)
+        enrichment_data = getattr(lead, 'enrichment_data', None)
+        
         context = {
             "recent_news": "No recent news",
-            "pain_points": ", ".join(lead.company.pain_points[:3]) if hasattr(lead.company, 'pain_points') else "General business challenges",
+            "pain_points": ", ".join(pain_points[:3]) if pain_points is not None else "General business challenges",
             "ai_insights": {}
         }
         
         # Add recent news
-        if hasattr(lead.company, 'recent_news') and lead.company.recent_news:
-            recent = lead.company.recent_news[0]
-            context["recent_news"] = f"{recent.title}"
+        if recent_news:
+            context["recent_news"] = f"{recent_news[0].title}"
             
         # Add AI insights if available
-        if hasattr(lead, 'enrichment_data') and lead.enrichment_data:
-            context["ai_insights"] = lead.enrichment_data.get("company_insights", {})
+        if enrichment_data:
+            context["ai_insights"] = enrichment_data.get("company_insights", {})
             
         return context
     
     def _parse_ai_email(self, ai_response: str) -> Tuple[str, str]:
         """Parse AI response into subject and body"""
-        lines = ai_response.strip().split('\n')
         subject = ""
         body_lines = []
         in_body = False
         
-        for line in lines:
-            if line.startswith("SUBJECT:"):
-                subject = line.replace("SUBJECT:", "").strip()
-            elif line.startswith("BODY:"):
+        for line in ai_response.strip().split('\n'):
+            tag, sep, rest = line.partition(':')
+            if sep and tag == "SUBJECT":
+                subject = rest.strip()
+            elif sep and tag == "BODY":
                 in_body = True
-                body_content = line.replace("BODY:", "").strip()
-                if body_content:
-                    body_lines.append(body_content)
+                rest = rest.strip()
+                if rest:
+                    body_lines.append(rest)
             elif in_body and line.strip():
                 body_lines.append(line)
                 
@@ -410,33 +1270,24 @@ BODY: [email body]"""
             
         return subject, body
 
-    async def _generate_ai_variations(self, lead: Lead, base_subject: str, base_body: str, config: OutreachConfig) -> List[Dict]:
-        """Generate A/B test variations using AI"""
-        
-        variations = [{"subject": base_subject, "body": base_body, "variant": "A"}]
-        
-        # Generate 2 more variations
-        variation_prompt = f"""Generate 2 alternative versions of this email with different angles:
-
-ORIGINAL SUBJECT: {base_subject}
-ORIGINAL BODY: {base_body}
-
-CONTEXT:
-- Recipient: {lead.contact.title} at {lead.company.name}
-- Industry: {lead.company.industry}
-
-Create variations that:
-1. First variation: Focus more on ROI and business impact
-2. Second variation: Focus more on innovation and competitive advantage
-
-Keep the same general length and tone. Format each as:
-VARIATION 1:
-SUBJECT: [subject]
-BODY: [body]
-
-VARIATION 2:
-SUBJECT: [subject]
-BODY: [body]"""
+    async def _generate_ai_variations(self, lead: Lead, base_subject: str, base_body: str, config: OutreachConfig) -> List[Dict]:
+        """
+        Generate A/B test variations using AI.
+        
+        Both alternatives come back from a single request; variation A is
+        always the base email.
+        """
+        
+        variations = [{"subject": base_subject, "body": base_body, "variant": "A"}]
+        
+        # Generate 2 more variations in one call
+        variation_prompt = _VARIATIONS_PROMPT_TMPL.substitute(
+            title=lead.contact.title,
+            company=lead.company.name,
+            industry=lead.company.industry,
+            subject=base_subject,
+            body=base_body
+        )
 
         try:
             response = await self.ai_engine.generate(variation_prompt, temperature=0.8)
@@ -467,31 +1318,34 @@ BODY: [body]"""
         """Parse multiple variations from AI response"""
         variations = []
         current_variation = {}
-        
-        lines = ai_response.strip().split('\n')
-        
-        for line in lines:
-            if line.startswith("VARIATION"):
-                if current_variation and "subject" in current_variation:
-                    if isinstance(current_variation.get("body"), list):
-                        current_variation["body"] = '\n'.join(current_variation["body"]).strip()
-                    variations.append(current_variation)
+        body_lines = []
+        in_body = False
+
+        def finalize():
+            if current_variation and "subject" in current_variation:
+                if in_body:
+                    current_variation["body"] = '\n'.join(body_lines).strip()
+                variations.append(current_variation)
+        
+        for line in ai_response.strip().split('\n'):
+            tag, sep, rest = line.partition(':')
+            if tag.startswith("VARIATION"):
+                finalize()
                 current_variation = {}
-            elif line.startswith("SUBJECT:"):
-                current_variation["subject"] = line.replace("SUBJECT:", "").strip()
-            elif line.startswith("BODY:"):
-                current_variation["body"] = []
-                body_content = line.replace("BODY:", "").strip()
-                if body_content:
-                    current_variation["body"].append(body_content)
-            elif current_variation.get("body") is not None and line.strip():
-                current_variation["body"].append(line)
+                in_body = False
+            elif sep and tag == "SUBJECT":
+                current_variation["subject"] = rest.strip()
+            elif sep and tag == "BODY":
+                in_body = True
+                body_lines = []
+                rest = rest.strip()
+                if rest:
+                    body_lines.append(rest)
+            elif in_body and line.strip():
+                body_lines.append(line)
                 
         # Finalize last variation
-        if current_variation and "subject" in current_variation:
-            if isinstance(current_variation.get("body"), list):
-                current_variation["body"] = '\n'.join(current_variation["body"]).strip()
-            variations.append(current_variation)
+        finalize()
             
         return variations
 
@@ -499,145 +1353,241 @@ BODY: [body]"""
         """Create synthetic A/B variations when AI generation fails"""
         variations = []
         
-        # Variation B: ROI-focused
-        roi_subject = base_subject.replace("Quick question", "ROI opportunity").replace("Partnership", "Revenue growth")
-        roi_body = base_body.replace("I noticed", "I saw that").replace("growth", "increase revenue by 25%").replace("discuss", "explore the ROI potential")
-        
-        variations.append({
-            "subject": roi_subject,
-            "body": roi_body,
-            "variant": "B"
-        })
-        
-        # Variation C: Innovation-focused  
-        innovation_subject = base_subject.replace("Quick question", "Innovation opportunity").replace("Partnership", "Competitive advantage")
-        innovation_body = base_body.replace("I noticed", "I came across").replace("growth", "stay ahead of competitors").replace("discuss", "explore innovative solutions")
-        
-        variations.append({
-            "subject": innovation_subject,
-            "body": innovation_body,
-            "variant": "C"
-        })
+        # Variation B: ROI-focused, Variation C: Innovation-focused
+        for variant, subject_map, body_map in _SYNTHETIC_VARIATIONS:
+            variations.append({
+                "subject": _SYNTHETIC_SUBJECT_RE.sub(lambda m: subject_map[m.group(0)], base_subject),
+                "body": _SYNTHETIC_BODY_RE.sub(lambda m: body_map[m.group(0)], base_body),
+                "variant": variant
+            })
         
         return variations
 
+    def _rate_cache_key(self, message: Dict, lead: Lead) -> str:
+        """Cache key for a prediction: message content plus industry and score bucket"""
+        # NUL-separated so the subject/body split is part of the key
+        digest = hashlib.blake2b(
+            f"{message['subject']}\0{message['body']}".encode(), digest_size=16
+        ).hexdigest()
+        return f"{digest}:{lead.company.industry}:{int(lead.score.total_score) // 10}"
+
     async def _predict_response_rate_ai(self, message: Dict, lead: Lead) -> float:
         """Use AI to predict response likelihood"""
         
-        prompt = f"""Analyze this sales email and predict the likelihood of a response (0.0-1.0):
-
-RECIPIENT:
-Title: {lead.contact.title}
-Seniority: {lead.contact.seniority if hasattr(lead.contact, 'seniority') else 'Unknown'}
-Industry: {lead.company.industry}
-Company Size: {lead.company.employee_count}
-Lead Score: {lead.score.total_score}/100
-
-EMAIL:
-Subject: {message['subject']}
-Body: {message['body']}
+        cache_key = self._rate_cache_key(message, lead)
+        if cache_key in self._rate_cache:
+            self._rate_cache.move_to_end(cache_key)
+            return self._rate_cache[cache_key]
 
-Consider these factors:
-1. Subject line effectiveness (compelling, relevant, not spammy)
-2. Opening line quality (personalized, relevant)
-3. Value proposition clarity
-4. Call-to-action strength (clear but not pushy)
-5. Overall length and readability
-6. Personalization depth
+        if self._rate_batch_window > 0:
+            return await self._queue_rate_prediction(message, lead)
 
-Provide:
-- Response probability (0.0-1.0)
-- Key strengths (2-3 points)
-- Key weaknesses (2-3 points)
-- One improvement suggestion
+        if self.redis_client:
+            try:
+                cached = await self.redis_client.get(f"rate:{cache_key}")
+                if cached is not None:
+                    probability = float(cached)
+                    self._remember_rate(cache_key, probability)
+                    return probability
+            except Exception as e:
+                self.logger.warning(f"Rate cache read failed: {e}")
 
-Format as JSON with keys: probability, strengths, weaknesses, improvement"""
+        prompt = _RESPONSE_RATE_PROMPT_TMPL.substitute(
+            title=lead.contact.title,
+            seniority=getattr(lead.contact, 'seniority', 'Unknown'),
+            industry=lead.company.industry,
+            employee_count=lead.company.employee_count,
+            lead_score=lead.score.total_score,
+            subject=message['subject'],
+            body=message['body']
+        )
 
         try:
             response = await self.ai_engine.generate(prompt, temperature=0.2)
             
-            prediction = json.loads(response.content)
+            prediction = _json_loads(response.content)
             
             # Store feedback for learning
-            if not hasattr(self, 'prediction_feedback'):
-                self.prediction_feedback = []
-                
             self.prediction_feedback.append({
                 "message_id": message.get("message_id"),
                 "prediction": prediction,
                 "lead_score": lead.score.total_score
             })
                 
-            return float(prediction.get("probability", 0.5))
+            probability = float(prediction.get("probability", 0.5))
         except:
             # Fallback calculation based on heuristics
             return self._calculate_response_probability_heuristic(message, lead)
+
+        # Only AI predictions are cached; heuristic fallbacks are cheap to recompute
+        self._remember_rate(cache_key, probability)
+        if self.redis_client:
+            try:
+                await self.redis_client.setex(f"rate:{cache_key}", _RATE_CACHE_TTL, str(probability))
+            except Exception as e:
+                self.logger.warning(f"Rate cache write failed: {e}")
+
+        return probability
+
+    async def _queue_rate_prediction(self, message: Dict, lead: Lead) -> float:
+        """
+        Wait for a prediction from the next batched AI call.
+        
+        Predictions requested within one batch window share a single
+        _predict_response_rate_ai_batch call. A full batch is sent at once
+        instead of waiting out the window.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_rates.append((message, lead, future))
+        
+        if len(self._pending_rates) >= self._rate_batch_size:
+            self._flush_rate_predictions()
+        elif self._rate_flush_handle is None:
+            self._rate_flush_handle = loop.call_later(self._rate_batch_window, self._flush_rate_predictions)
+        
+        return await future
+
+    def _flush_rate_predictions(self):
+        """Send every queued prediction request as one batch"""
+        if self._rate_flush_handle is not None:
+            self._rate_flush_handle.cancel()
+            self._rate_flush_handle = None
+        batch, self._pending_rates = self._pending_rates, []
+        if not batch:
+            return
+        
+        task = asyncio.ensure_future(self._run_rate_batch(batch))
+        self._rate_batch_tasks.add(task)
+        task.add_done_callback(self._rate_batch_tasks.discard)
+
+    async def _run_rate_batch(self, batch: List[Tuple[Dict, Lead, asyncio.Future]]):
+        """Predict a flushed batch and resolve each waiting caller"""
+        messages, leads, futures = zip(*batch)
+        try:
+            probabilities = await self._predict_response_rate_ai_batch(list(messages), list(leads))
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for future, probability in zip(futures, probabilities):
+            if not future.done():
+                future.set_result(probability)
+
+    async def _predict_response_rate_ai_batch(self, messages: List[Dict], leads: List[Lead]) -> List[float]:
+        """
+        Predict response likelihood for many messages with one AI call.
+        
+        Cached predictions are reused as in _predict_response_rate_ai; the
+        rest share a single prompt. If the reply cannot be parsed into one
+        prediction per message, those messages fall back to the heuristic.
+        """
+        cache_keys = [self._rate_cache_key(message, lead) for message, lead in zip(messages, leads)]
+        probabilities: List[Optional[float]] = [None] * len(cache_keys)
+        
+        pending = []
+        for i, cache_key in enumerate(cache_keys):
+            if cache_key in self._rate_cache:
+                self._rate_cache.move_to_end(cache_key)
+                probabilities[i] = self._rate_cache[cache_key]
+            else:
+                pending.append(i)
+        
+        if pending and self.redis_client:
+            try:
+                cached = await self.redis_client.mget([f"rate:{cache_keys[i]}" for i in pending])
+                still_pending = []
+                for i, value in zip(pending, cached):
+                    if value is None:
+                        still_pending.append(i)
+                    else:
+                        probabilities[i] = float(value)
+                        self._remember_rate(cache_keys[i], probabilities[i])
+                pending = still_pending
+            except Exception as e:
+                self.logger.warning(f"Rate cache read failed: {e}")
+        
+        if not pending:
+            return probabilities
+        
+        emails = "\n\n".join(
+            _RESPONSE_RATE_BATCH_ITEM_TMPL.substitute(
+                index=n,
+                title=leads[i].contact.title,
+                seniority=getattr(leads[i].contact, 'seniority', 'Unknown'),
+                industry=leads[i].company.industry,
+                employee_count=leads[i].company.employee_count,
+                lead_score=leads[i].score.total_score,
+                subject=messages[i]['subject'],
+                body=messages[i]['body']
+            )
+            for n, i in enumerate(pending, 1)
+        )
+        prompt = _RESPONSE_RATE_BATCH_PROMPT_TMPL.substitute(count=len(pending), emails=emails)
+        
+        try:
+            response = await self.ai_engine.generate(prompt, temperature=0.2)
+            predictions = _json_loads(response.content)
+            if not isinstance(predictions, list) or len(predictions) != len(pending):
+                raise ValueError("Expected one prediction per email")
+            batch = [float(prediction.get("probability", 0.5)) for prediction in predictions]
+        except Exception:
+            # Fallback calculation based on heuristics
+            for i in pending:
+                probabilities[i] = self._calculate_response_probability_heuristic(messages[i], leads[i])
+            return probabilities
+        
+        for i, prediction, probability in zip(pending, predictions, batch):
+            self.prediction_feedback.append({
+                "message_id": messages[i].get("message_id"),
+                "prediction": prediction,
+                "lead_score": leads[i].score.total_score
+            })
+            probabilities[i] = probability
+            self._remember_rate(cache_keys[i], probability)
+        
+        if self.redis_client:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for i in pending:
+                    pipe.setex(f"rate:{cache_keys[i]}", _RATE_CACHE_TTL, str(probabilities[i]))
+                await pipe.execute()
+            except Exception as e:
+                self.logger.warning(f"Rate cache write failed: {e}")
+        
+        return probabilities
+
+    def _remember_rate(self, cache_key: str, probability: float):
+        """Store a prediction in the local LRU, evicting the oldest entry when full"""
+        self._rate_cache[cache_key] = probability
+        self._rate_cache.move_to_end(cache_key)
+        if len(self._rate_cache) > _RATE_CACHE_SIZE:
+            self._rate_cache.popitem(last=False)
             
     def _calculate_response_probability_heuristic(self, message: Dict, lead: Lead) -> float:
         """Enhanced heuristic-based response prediction with quality correlation"""
-        score = 0.3  # Lower base score
-        
-        # Lead quality bonus (reduced impact)
-        score += (lead.score.total_score / 100) * 0.2
-        
-        # Message quality factors (more discriminating)
-        subject = message.get("subject", "")
-        body = message.get("body", "")
-        body_words = body.split()
-        
-        # Subject line quality
-        if 30 < len(subject) < 60:  # Optimal length
-            score += 0.1
-        if any(word in subject.lower() for word in ["question", "opportunity", "partnership"]):
-            score += 0.05
-        if any(spam in subject.lower() for spam in ["free", "guarantee", "urgent", "!!!"]):
-            score -= 0.2
-            
-        # Body quality
-        if 50 < len(body_words) < 150:  # Optimal length
-            score += 0.15
-        elif len(body_words) > 200:  # Too long
-            score -= 0.1
-        elif len(body_words) < 30:  # Too short
-            score -= 0.1
-            
-        # Personalization (higher weight)
-        if lead.contact.first_name in body:
-            score += 0.15
-        if lead.company.name in body:
-            score += 0.1
-            
-        # Professional quality indicators
-        if any(word in body.lower() for word in ["noticed", "congratulations", "brief call", "discuss"]):
-            score += 0.1
-        if "would you be" in body.lower() or "are you interested" in body.lower():
-            score += 0.05
-            
-        # Negative quality indicators
-        spam_phrases = ["guarantee", "100%", "free", "limited time", "act now", "click here"]
-        spam_count = sum(1 for phrase in spam_phrases if phrase in body.lower())
-        score -= spam_count * 0.1
-        
-        # Excessive punctuation or caps
-        if body.count("!") > 2:
-            score -= 0.1
-        caps_ratio = sum(1 for c in body if c.isupper()) / max(1, len(body))
-        if caps_ratio > 0.1:
-            score -= 0.15
-            
-        return min(0.9, max(0.05, score))
+        return _cached_response_heuristic(
+            message.get("subject", ""),
+            message.get("body", ""),
+            lead.contact.first_name,
+            lead.company.name,
+            lead.score.total_score
+        )
 
     async def _quality_check_ai_message(self, message: str, lead: Lead) -> Dict[str, Any]:
         """Ensure AI-generated message meets quality standards"""
+        message_lower = message.lower()
         
         checks = {
             "length_appropriate": 50 < len(message.split()) < 300,
             "no_hallucinations": self._check_no_hallucinations(message, lead),
-            "professional_tone": await self._check_professional_tone(message),
-            "no_spam_triggers": self._check_spam_score(message) < 3.0,
+            "professional_tone": await self._check_professional_tone(message, message_lower),
+            "no_spam_triggers": self._check_spam_score(message, message_lower) < 3.0,
             "has_personalization": lead.contact.first_name in message or lead.company.name in message,
-            "has_clear_cta": any(phrase in message.lower() for phrase in ["call", "meeting", "discuss", "chat", "connect", "schedule"]),
-            "no_sensitive_topics": self._check_no_sensitive_topics(message)
+            "has_clear_cta": any(phrase in message_lower for phrase in _CTA_PHRASES),
+            "no_sensitive_topics": self._check_no_sensitive_topics(message, message_lower)
         }
         
         passed = all(checks.values())
@@ -657,61 +1607,56 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
             return False
         
         # Don't mention specific people unless we know them
-        import re
-        names_mentioned = re.findall(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', message)
+        names_mentioned = _FULL_NAME_RE.findall(message)
         known_names = [lead.contact.full_name]
-        if hasattr(lead.contact, 'first_name') and hasattr(lead.contact, 'last_name'):
-            known_names.append(f"{lead.contact.first_name} {lead.contact.last_name}")
+        first_name = getattr(lead.contact, 'first_name', None)
+        last_name = getattr(lead.contact, 'last_name', None)
+        if first_name is not None and last_name is not None:
+            known_names.append(f"{first_name} {last_name}")
             
         for name in names_mentioned:
-            if name not in known_names and name not in ["Sales Representative", "Account Executive"]:
+            if name not in known_names and name not in _KNOWN_ROLE_NAMES:
                 return False  # Mentioned unknown person
                 
         return True
     
-    async def _check_professional_tone(self, message: str) -> bool:
+    async def _check_professional_tone(self, message: str, message_lower: Optional[str] = None) -> bool:
         """Check if message maintains professional tone"""
-        unprofessional_phrases = [
-            "guarantee success", "100% guaranteed", "no risk", "act now",
-            "limited time", "once in a lifetime", "don't miss out", "urgent"
-        ]
-        
-        message_lower = message.lower()
-        return not any(phrase in message_lower for phrase in unprofessional_phrases)
+        if message_lower is None:
+            message_lower = message.lower()
+        return not any(phrase in message_lower for phrase in _UNPROFESSIONAL_PHRASES)
     
-    def _check_spam_score(self, message: str) -> float:
+    def _check_spam_score(self, message: str, message_lower: Optional[str] = None) -> float:
         """Simple spam score calculation"""
-        spam_triggers = [
-            "free", "guarantee", "no obligation", "act now", "limited time",
-            "click here", "buy now", "special offer", "!!!!", "$$",
-            "100% guaranteed", "risk-free", "urgent", "winner"
-        ]
-        
-        message_lower = message.lower()
+        if message_lower is None:
+            message_lower = message.lower()
         score = 0.0
         
-        for trigger in spam_triggers:
+        for trigger in _SPAM_TRIGGERS:
             if trigger in message_lower:
                 score += 0.5
                 
         # Excessive caps
-        caps_ratio = sum(1 for c in message if c.isupper()) / max(1, len(message))
+        caps_ratio = sum(map(str.isupper, message)) / max(1, len(message))
         if caps_ratio > 0.3:
             score += 2.0
             
         return score
 
-    def _check_no_sensitive_topics(self, message: str) -> bool:
+    def _check_no_sensitive_topics(self, message: str, message_lower: Optional[str] = None) -> bool:
         """Ensure message avoids sensitive topics"""
-        sensitive_terms = [
-            "layoff", "fired", "bankruptcy", "lawsuit", "scandal",
-            "controversy", "failure", "crisis", "problem"
-        ]
-        
-        message_lower = message.lower()
-        return not any(term in message_lower for term in sensitive_terms)
+        if message_lower is None:
+            message_lower = message.lower()
+        return not any(term in message_lower for term in _SENSITIVE_TERMS)
 
-    def _compose_with_template(self, lead: Lead, template_id: str, config: OutreachConfig) -> OutreachMessage:
+    def _compose_with_template(
+        self,
+        lead: Lead,
+        template_id: str,
+        config: OutreachConfig,
+        now: Optional[datetime] = None,
+        precomputed_vars: Optional[Dict[str, str]] = None
+    ) -> OutreachMessage:
         """
         Generate message using template system.
         
@@ -722,16 +1667,32 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
         4. Apply industry-specific variants
         5. Personalize based on depth setting
         """
+        return self._compose_with_template_ex(lead, template_id, config, now, precomputed_vars)[0]
+
+    def _compose_with_template_ex(
+        self,
+        lead: Lead,
+        template_id: str,
+        config: OutreachConfig,
+        now: Optional[datetime] = None,
+        precomputed_vars: Optional[Dict[str, str]] = None
+    ) -> Tuple[OutreachMessage, Dict[str, str]]:
+        """
+        Same as _compose_with_template, but also return the lead's
+        personalization variables so follow-up steps can reuse them.
+        """
         try:
             template = self.template_library.get_template(template_id)
             if not template:
                 raise ValueError(f"Template {template_id} not found")
             
-            # Extract personalization variables
-            variables = self._extract_personalization_variables(lead)
+            # Extract personalization variables, unless the caller already has them
+            lead_variables = precomputed_vars
+            if lead_variables is None:
+                lead_variables = self._extract_personalization_variables(lead)
             
             # Add sender information
-            variables.update(config.sender_info)
+            variables = {**lead_variables, **config.sender_info}
             
             # Fill in missing variables with smart defaults
             variables = self._smart_defaults(variables, template.variables)
@@ -759,8 +1720,8 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
             # Ensure message length
             body = self._ensure_message_length(body, config.max_length)
             
-            return OutreachMessage(
-                message_id=f"msg_{uuid.uuid4()}",
+            message = OutreachMessage(
+                message_id=f"msg_{self._next_uuid()}",
                 lead_id=lead.lead_id,
                 subject=subject,
                 body=body,
@@ -771,33 +1732,42 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
                 predicted_response_rate=0.0,  # Will be calculated later
                 generation_mode=self.mode,
                 ab_variant="A",
-                created_at=datetime.now(),
+                created_at=now or datetime.now(),
                 metadata={
                     "template_name": template.name,
                     "variables_used": list(variables.keys()),
                     "personalization_depth": config.personalization_depth
                 }
             )
+            return message, lead_variables
             
         except Exception as e:
             self.logger.error(f"Error composing with template: {e}")
             raise
 
-    async def _compose_with_ai(self, lead: Lead, style_guide: Dict, config: OutreachConfig) -> OutreachMessage:
+    def _compose_with_enhanced_template(
+        self,
+        lead: Lead,
+        style_guide: Dict,
+        config: OutreachConfig,
+        now: Optional[datetime] = None,
+        precomputed_vars: Optional[Dict[str, str]] = None
+    ) -> OutreachMessage:
         """
-        Generate message using AI (placeholder for future).
+        Compose with the best template and simulated AI enhancement.
         
-        For now, returns enhanced template version.
+        Used by _compose_with_ai when there is no AI engine or its reply
+        cannot be parsed into an email.
         """
-        self.logger.info("AI composition requested - using enhanced template approach")
+        self.logger.info("AI composition unavailable - using enhanced template approach")
         
-        # For now, use the best template and enhance it
+        # Use the best template and enhance it
         template_id = self.select_template(lead, config)
-        base_message = self._compose_with_template(lead, template_id, config)
+        base_message, variables = self._compose_with_template_ex(lead, template_id, config, now, precomputed_vars)
         
         # Simulate AI enhancement
-        enhanced_body = self._ai_enhance_message(base_message.body, lead, style_guide)
-        enhanced_subject = self._ai_enhance_subject(base_message.subject, lead)
+        enhanced_body = self._ai_enhance_message(base_message.body, lead, style_guide, variables)
+        enhanced_subject = self._ai_enhance_subject(base_message.subject, lead, variables)
         
         base_message.body = enhanced_body
         base_message.subject = enhanced_subject
@@ -829,72 +1799,75 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
         - industry, department, title
         - similar_company (from same industry in database)
         - specific_result (based on pain point)
+        
+        Results are cached per lead_id, so the random default picks stay fixed
+        for a lead across template retries and A/B variants. Call
+        clear_lead_cache() when a lead's data changes.
         """
-        variables = {}
-        
-        # Basic contact info
-        variables["first_name"] = lead.contact.first_name
-        variables["last_name"] = lead.contact.last_name
-        variables["full_name"] = lead.contact.full_name
-        variables["company"] = lead.company.name
-        variables["title"] = lead.contact.title
-        variables["department"] = lead.contact.department
-        variables["industry"] = lead.company.industry
-        
-        # Company details
-        variables["company_size"] = str(lead.company.employee_count)
-        variables["company_location"] = lead.company.location
-        variables["company_founded"] = str(lead.company.founded_year)
+        cached = self._var_cache.get(lead.lead_id)
+        if cached is not None:
+            self._var_cache.move_to_end(lead.lead_id)
+            return cached.copy()
+        
+        contact = lead.contact
+        company = lead.company
+        industry = company.industry
+        profile = _INDUSTRY_PROFILES.get(industry, _DEFAULT_INDUSTRY_PROFILE)
+        
+        variables = {
+            # Basic contact info
+            "first_name": contact.first_name,
+            "last_name": contact.last_name,
+            "full_name": contact.full_name,
+            "company": company.name,
+            "title": contact.title,
+            "department": contact.department,
+            "industry": industry,
+            # Company details
+            "company_size": str(company.employee_count),
+            "company_location": company.location,
+            "company_founded": str(company.founded_year)
+        }
         
         # Recent achievement from company news
-        if hasattr(lead.company, 'recent_news') and lead.company.recent_news:
-            latest_news = lead.company.recent_news[0]
-            variables["recent_achievement"] = latest_news.title.lower()
+        recent_news = getattr(company, 'recent_news', None)
+        if recent_news:
+            variables["recent_achievement"] = recent_news[0].title.lower()
         else:
             # Use industry-specific default
-            achievements = self.company_achievements.get(lead.company.industry, ["has been growing rapidly"])
-            variables["recent_achievement"] = random.choice(achievements)
+            variables["recent_achievement"] = random.choice(profile.achievements)
         
         # Pain points
-        if hasattr(lead.company, 'pain_points') and lead.company.pain_points:
-            variables["pain_point"] = lead.company.pain_points[0]
+        pain_points = getattr(company, 'pain_points', None)
+        if pain_points:
+            variables["pain_point"] = pain_points[0]
         else:
             # Use industry-specific default
-            pain_points = self.pain_points_mapping.get(lead.company.industry, ["operational efficiency"])
-            variables["pain_point"] = random.choice(pain_points)
+            variables["pain_point"] = random.choice(profile.pain_points)
         
         # Similar company (simplified - would use actual database lookup)
-        industry_companies = {
-            "SaaS": ["Salesforce", "HubSpot", "Zendesk"],
-            "FinTech": ["Stripe", "Square", "Plaid"],
-            "E-commerce": ["Shopify", "BigCommerce", "Magento"],
-            "Healthcare": ["Epic", "Cerner", "Veracyte"],
-            "Manufacturing": ["GE", "Siemens", "Honeywell"]
-        }
-        similar_companies = industry_companies.get(lead.company.industry, ["companies like yours"])
+        similar_companies = _INDUSTRY_COMPANIES.get(industry, ("companies like yours",))
         variables["similar_company"] = random.choice(similar_companies)
         
         # Specific result based on pain point
-        results_mapping = {
-            "customer churn": "reduce churn by 30%",
-            "scaling infrastructure": "scale 10x without downtime",
-            "regulatory compliance": "achieve compliance 50% faster",
-            "cart abandonment": "recover 25% of abandoned carts",
-            "production efficiency": "increase efficiency by 35%"
-        }
-        variables["specific_result"] = results_mapping.get(variables["pain_point"], "achieve significant improvements")
+        variables["specific_result"] = _RESULTS_MAPPING.get(variables["pain_point"], "achieve significant improvements")
         
         # Value proposition
-        value_props = {
-            "SaaS": "increase customer retention and reduce churn",
-            "FinTech": "streamline compliance and enhance security",
-            "E-commerce": "boost conversions and customer lifetime value",
-            "Healthcare": "improve patient outcomes and operational efficiency",
-            "Manufacturing": "optimize production and reduce costs"
-        }
-        variables["value_proposition"] = value_props.get(lead.company.industry, "drive growth and efficiency")
+        variables["value_proposition"] = _VALUE_PROPS.get(industry, "drive growth and efficiency")
         
-        return variables
+        self._var_cache[lead.lead_id] = variables
+        if len(self._var_cache) > _VAR_CACHE_SIZE:
+            self._var_cache.popitem(last=False)
+        return variables.copy()
+
+    def clear_lead_cache(self, lead_id: Optional[str] = None):
+        """Forget cached personalization data for one lead, or for all leads"""
+        if lead_id is None:
+            self._var_cache.clear()
+            self._needle_cache.clear()
+        else:
+            self._var_cache.pop(lead_id, None)
+            self._needle_cache.pop(lead_id, None)
 
     def _smart_defaults(self, variables: Dict[str, str], required: List[str]) -> Dict[str, str]:
         """
@@ -934,56 +1907,68 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
 
     def _fill_template_variables(self, template: str, variables: Dict[str, str]) -> str:
         """Fill template variables with actual values"""
-        result = template
-        for var, value in variables.items():
-            placeholder = f"{{{{{var}}}}}"
-            result = result.replace(placeholder, str(value))
-        return result
+        return fill_template(self.template_library.get_compiled(template), variables)
 
     def _enhance_personalization(self, body: str, lead: Lead, variables: Dict[str, str]) -> str:
         """Add deep personalization touches"""
         # Add industry-specific insights
-        if lead.company.industry in self.industry_insights:
-            insights = self.industry_insights[lead.company.industry]
-            trend = random.choice(insights["trends"])
+        profile = _INDUSTRY_PROFILES.get(lead.company.industry, _DEFAULT_INDUSTRY_PROFILE)
+        if profile.trends:
+            trend = random.choice(profile.trends)
             body += f"\n\nP.S. I see {lead.company.industry} is embracing {trend} - exciting times ahead!"
         
         return body
 
     def _ensure_message_length(self, body: str, max_length: int) -> str:
         """Ensure message doesn't exceed max length"""
+        # Every word needs a character plus a separator, so short bodies
+        # cannot exceed the limit and skip the split entirely
+        if (len(body) + 1) // 2 <= max_length:
+            return body
         words = body.split()
         if len(words) > max_length:
             body = " ".join(words[:max_length]) + "..."
         return body
 
-    def _ai_enhance_message(self, body: str, lead: Lead, style_guide: Dict) -> str:
+    def _ai_enhance_message(self, body: str, lead: Lead, style_guide: Dict, variables: Optional[Dict[str, str]] = None) -> str:
         """Simulate AI enhancement of message"""
-        # For now, just add some AI-like touches
-        enhancements = [
-            f"Based on {lead.company.name}'s recent growth trajectory, ",
-            f"Given your role as {lead.contact.title}, ",
-            f"Considering {lead.company.industry} market dynamics, "
-        ]
-        
-        enhancement = random.choice(enhancements)
-        sentences = body.split('. ')
-        if len(sentences) > 1:
-            sentences[1] = enhancement + sentences[1].lower()
-            body = '. '.join(sentences)
-        
-        return body
+        # For now, just add some AI-like touches; pick the variant first so
+        # only the chosen prefix is formatted. Callers that already extracted
+        # the lead's variables pass them in to skip the attribute lookups.
+        i = random.randrange(3)
+        if i == 0:
+            company = variables["company"] if variables else lead.company.name
+            enhancement = f"Based on {company}'s recent growth trajectory, "
+        elif i == 1:
+            title = variables["title"] if variables else lead.contact.title
+            enhancement = f"Given your role as {title}, "
+        else:
+            industry = variables["industry"] if variables else lead.company.industry
+            enhancement = f"Considering {industry} market dynamics, "
+        
+        # Prefix the second sentence, located by index rather than splitting
+        # the whole body into sentences
+        start = body.find('. ')
+        if start == -1:
+            return body
+        start += 2
+        end = body.find('. ', start)
+        if end == -1:
+            end = len(body)
+        
+        return body[:start] + enhancement + body[start:end].lower() + body[end:]
 
-    def _ai_enhance_subject(self, subject: str, lead: Lead) -> str:
+    def _ai_enhance_subject(self, subject: str, lead: Lead, variables: Optional[Dict[str, str]] = None) -> str:
         """Simulate AI enhancement of subject line"""
         # Add urgency or curiosity elements
-        enhancements = [
-            f"Re: {lead.company.name}'s growth opportunity",
-            f"Quick question for {lead.contact.first_name}",
-            f"{lead.company.name} + efficiency gains"
-        ]
-        
-        return random.choice(enhancements)
+        i = random.randrange(3)
+        if i == 1:
+            first_name = variables["first_name"] if variables else lead.contact.first_name
+            return f"Quick question for {first_name}"
+        company = variables["company"] if variables else lead.company.name
+        if i == 0:
+            return f"Re: {company}'s growth opportunity"
+        return f"{company} + efficiency gains"
 
     def _create_style_guide(self, lead: Lead, config: OutreachConfig) -> Dict:
         """Create style guide for AI composition"""
@@ -1015,44 +2000,38 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
         - Different value propositions emphasis
         """
         variants = []
+        body = base_message.body
         
         # Get template for more subject lines
         if base_message.template_id:
             template = self.template_library.get_template(base_message.template_id)
-            if template and len(template.subject_lines) > 1:
-                for i, subject in enumerate(template.subject_lines[:3]):
-                    variant_letter = chr(65 + i)  # A, B, C
-                    variables = self._extract_personalization_variables(lead)
-                    filled_subject = self._fill_template_variables(subject, variables)
+            subject_lines = template.subject_lines if template else []
+            if len(subject_lines) > 1:
+                # One variables dict fills every subject line
+                variables = self._extract_personalization_variables(lead)
+                for i in range(min(3, len(subject_lines))):
+                    variant_letter = _VARIANT_LETTERS[i]  # A, B, C
                     
                     variants.append({
                         "variant": variant_letter,
-                        "subject": filled_subject,
-                        "body": base_message.body,
+                        "subject": self._fill_template_variables(subject_lines[i], variables),
+                        "body": body,
                         "changes": f"Subject line variation {variant_letter}"
                     })
         
         # CTA variations
-        cta_variations = [
-            "Would you be open to a brief 15-minute call?",
-            "Worth a quick chat to explore this?",
-            "Available for a brief conversation this week?"
-        ]
-        
-        for i, cta in enumerate(cta_variations):
-            variant_letter = chr(65 + i + 3)  # D, E, F
-            modified_body = base_message.body.replace(
-                "Would you be open to a brief 15-minute call",
-                cta
-            )
+        for i, cta in enumerate(_CTA_VARIATIONS):
+            if len(variants) >= 3:
+                break  # Return max 3 variants
+            variant_letter = _VARIANT_LETTERS[i + 3]  # D, E, F
             variants.append({
                 "variant": variant_letter,
                 "subject": base_message.subject,
-                "body": modified_body,
+                "body": body.replace("Would you be open to a brief 15-minute call", cta),
                 "changes": f"CTA variation {variant_letter}"
             })
         
-        return variants[:3]  # Return max 3 variants
+        return variants
 
     def optimize_subject_line(self, subject_lines: List[str], lead: Lead) -> str:
         """
@@ -1067,35 +2046,40 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
         if not subject_lines:
             return "Quick question about your business"
         
-        # Score each subject line
-        scores = []
-        for subject in subject_lines:
+        industry = lead.company.industry
+        is_c_level = "C-Level" in lead.contact.seniority
+        is_vp = "VP" in lead.contact.title
+        employee_count = lead.company.employee_count
+        
+        # Score each subject line, keeping the first highest-scoring one
+        best_index, best_score = 0, -1
+        for i, subject in enumerate(subject_lines):
+            subject_lower = subject.lower()
             score = 0
             
             # Industry preferences
-            if lead.company.industry == "SaaS" and "question" in subject.lower():
+            if industry == "SaaS" and "question" in subject_lower:
                 score += 10
-            elif lead.company.industry == "FinTech" and "partnership" in subject.lower():
+            elif industry == "FinTech" and "partnership" in subject_lower:
                 score += 10
-            elif lead.company.industry == "E-commerce" and "idea" in subject.lower():
+            elif industry == "E-commerce" and "idea" in subject_lower:
                 score += 10
             
             # Title/seniority preferences
-            if "C-Level" in lead.contact.seniority and len(subject.split()) <= 6:
+            if is_c_level and len(subject.split()) <= 6:
                 score += 15  # Executives prefer shorter subjects
-            elif "VP" in lead.contact.title and "quick" in subject.lower():
+            elif is_vp and "quick" in subject_lower:
                 score += 10
             
             # Company size preferences
-            if lead.company.employee_count > 1000 and "partnership" in subject.lower():
+            if employee_count > 1000 and "partnership" in subject_lower:
                 score += 5
-            elif lead.company.employee_count < 100 and "idea" in subject.lower():
+            elif employee_count < 100 and "idea" in subject_lower:
                 score += 5
             
-            scores.append(score)
+            if score > best_score:
+                best_index, best_score = i, score
         
-        # Return subject line with highest score
-        best_index = scores.index(max(scores))
         return subject_lines[best_index]
 
     def calculate_personalization_score(self, message: str, lead: Lead) -> float:
@@ -1110,53 +2094,46 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
         
         Returns: 0.0 (generic) to 1.0 (highly personalized)
         """
-        score = 0.0
         message_lower = message.lower()
+        score = 0.0
         
-        # Check for personalized elements
-        if lead.contact.first_name.lower() in message_lower:
-            score += 0.15
-        
-        if lead.company.name.lower() in message_lower:
-            score += 0.20
-        
-        if lead.company.industry.lower() in message_lower:
-            score += 0.15
-        
-        if lead.contact.title.lower() in message_lower:
-            score += 0.10
-        
-        # Check for specific company references
-        if hasattr(lead.company, 'recent_news') and lead.company.recent_news:
-            for news in lead.company.recent_news:
-                if any(word in message_lower for word in news.title.lower().split()[:3]):
-                    score += 0.15
-                    break
-        
-        # Check for pain point relevance
-        if hasattr(lead.company, 'pain_points') and lead.company.pain_points:
-            for pain_point in lead.company.pain_points:
-                if pain_point.lower() in message_lower:
-                    score += 0.15
+        # Each group scores at most once, on its first matching needle
+        for weight, needles in self._personalization_needles(lead):
+            for needle in needles:
+                if needle in message_lower:
+                    score += weight
                     break
         
-        # Check for industry-specific terminology
-        industry_terms = {
-            "SaaS": ["churn", "ARR", "MRR", "onboarding", "activation"],
-            "FinTech": ["compliance", "security", "fraud", "transaction", "regulatory"],
-            "E-commerce": ["conversion", "cart", "checkout", "fulfillment", "retention"],
-            "Healthcare": ["patient", "HIPAA", "clinical", "outcomes", "care"],
-            "Manufacturing": ["production", "efficiency", "quality", "automation", "supply chain"]
-        }
-        
-        terms = industry_terms.get(lead.company.industry, [])
-        for term in terms:
-            if term in message_lower:
-                score += 0.05
-                break
-        
         return min(score, 1.0)
 
+    def _personalization_needles(self, lead: Lead) -> Tuple[Tuple[float, Tuple[str, ...]], ...]:
+        """Weighted needle groups for personalization scoring, cached per lead"""
+        cached = self._needle_cache.get(lead.lead_id)
+        if cached is not None:
+            self._needle_cache.move_to_end(lead.lead_id)
+            return cached
+        
+        recent_news = getattr(lead.company, 'recent_news', None) or []
+        pain_points = getattr(lead.company, 'pain_points', None) or []
+        needles = (
+            # Personalized elements
+            (0.15, (lead.contact.first_name.lower(),)),
+            (0.20, (lead.company.name.lower(),)),
+            (0.15, (lead.company.industry.lower(),)),
+            (0.10, (lead.contact.title.lower(),)),
+            # Specific company references
+            (0.15, tuple(word for news in recent_news for word in news.title.lower().split()[:3])),
+            # Pain point relevance
+            (0.15, tuple(pain_point.lower() for pain_point in pain_points)),
+            # Industry-specific terminology
+            (0.05, _INDUSTRY_TERM_NEEDLES.get(lead.company.industry, ()))
+        )
+        
+        self._needle_cache[lead.lead_id] = needles
+        if len(self._needle_cache) > _VAR_CACHE_SIZE:
+            self._needle_cache.popitem(last=False)
+        return needles
+
     def predict_response_rate(self, message: OutreachMessage, lead: Lead) -> float:
         """
         Predict likelihood of response.
@@ -1170,51 +2147,32 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
         
         Returns: 0.0 (unlikely) to 1.0 (very likely)
         """
-        base_rate = 0.15  # Base response rate
-        
-        # Factor 1: Message length (optimal: 150-200 words)
-        word_count = len(message.body.split())
-        if 150 <= word_count <= 200:
-            length_factor = 1.0
-        elif 100 <= word_count < 150 or 200 < word_count <= 250:
-            length_factor = 0.8
-        else:
-            length_factor = 0.6
-        
-        # Factor 2: Personalization score
-        personalization_factor = message.personalization_score
-        
-        # Factor 3: Subject line quality (simplified)
-        subject_quality = 0.8  # Default
-        if len(message.subject.split()) <= 8:
-            subject_quality = 0.9
-        if message.subject.endswith('?'):
-            subject_quality += 0.1
-        
-        # Factor 4: Lead score influence
-        lead_score_factor = min(lead.score.total_score / 100, 1.0)
-        
-        # Factor 5: Industry response rates
-        industry_rates = {
-            "SaaS": 0.18,
-            "FinTech": 0.12,
-            "E-commerce": 0.15,
-            "Healthcare": 0.10,
-            "Manufacturing": 0.08
-        }
-        industry_factor = industry_rates.get(lead.company.industry, 0.12)
-        
-        # Combine factors
-        predicted_rate = (
-            base_rate * 0.2 +
-            length_factor * self.response_rate_factors["message_length"] +
-            personalization_factor * self.response_rate_factors["personalization_score"] +
-            subject_quality * self.response_rate_factors["subject_line_quality"] +
-            lead_score_factor * self.response_rate_factors["lead_score"] +
-            industry_factor * self.response_rate_factors["timing"]
+        return _response_rate_core(
+            len(message.body.split()),
+            message.personalization_score,
+            len(message.subject.split()),
+            message.subject.endswith('?'),
+            lead.score.total_score,
+            _INDUSTRY_RATES.get(lead.company.industry, 0.12),
+            self.response_rate_factors
         )
-        
-        return min(predicted_rate, 1.0)
+
+    def predict_response_rate_batch(self, messages: List[OutreachMessage], leads: List[Lead]) -> List[float]:
+        """Predict response rates for paired messages and leads"""
+        factors = self.response_rate_factors
+        industry_rates = _INDUSTRY_RATES
+        return [
+            _response_rate_core(
+                len(message.body.split()),
+                message.personalization_score,
+                len(message.subject.split()),
+                message.subject.endswith('?'),
+                lead.score.total_score,
+                industry_rates.get(lead.company.industry, 0.12),
+                factors
+            )
+            for message, lead in zip(messages, leads)
+        ]
 
     def select_template(self, lead: Lead, config: OutreachConfig) -> str:
         """
@@ -1227,8 +2185,60 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
         - Company stage (startup vs enterprise)
         - Previous interactions
         """
+        # Scoring only depends on these buckets, so leads that share them
+        # share a template choice
+        total_score = lead.score.total_score
+        if total_score >= 80:
+            score_bucket = "high"
+        elif total_score >= 60:
+            score_bucket = "medium"
+        else:
+            score_bucket = "low"
+        
+        industry = lead.company.industry
+        if industry in ("SaaS", "FinTech"):
+            industry_bucket = "technical"
+        elif industry in ("Healthcare", "Manufacturing"):
+            industry_bucket = "regulated"
+        else:
+            industry_bucket = "other"
+        
+        if "C-Level" in lead.contact.seniority:
+            role_bucket = "c_level"
+        elif "VP" in lead.contact.title:
+            role_bucket = "vp"
+        elif "Director" in lead.contact.title:
+            role_bucket = "director"
+        else:
+            role_bucket = "other"
+        
+        employee_count = lead.company.employee_count
+        if employee_count > 1000:
+            size_bucket = "enterprise"
+        elif employee_count < 100:
+            size_bucket = "small"
+        else:
+            size_bucket = "mid"
+        
+        key = (config.category, score_bucket, industry_bucket, role_bucket, size_bucket, config.tone)
+        template_id = self._template_choice_cache.get(key)
+        if template_id is None:
+            template_id = self._score_templates(*key)
+            self._template_choice_cache[key] = template_id
+        return template_id
+
+    def _score_templates(
+        self,
+        category: str,
+        score_bucket: str,
+        industry_bucket: str,
+        role_bucket: str,
+        size_bucket: str,
+        tone: Optional[ToneStyle]
+    ) -> str:
+        """Score every template in a category against a lead's buckets and pick the best"""
         # Get templates for the specified category
-        templates = self.template_library.get_templates_by_category(config.category)
+        templates = self.template_library.get_templates_by_category(category)
         
         if not templates:
             # Default to cold outreach if category not found
@@ -1240,13 +2250,13 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
             score = 0
             
             # Lead score influence
-            if lead.score.total_score >= 80:
+            if score_bucket == "high":
                 # High score leads → more direct approach
                 if template.tone == ToneStyle.EXECUTIVE:
                     score += 20
                 elif template.tone == ToneStyle.FORMAL:
                     score += 15
-            elif lead.score.total_score >= 60:
+            elif score_bucket == "medium":
                 # Medium score leads → balanced approach
                 if template.tone == ToneStyle.FORMAL:
                     score += 20
@@ -1260,48 +2270,48 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
                     score += 10
             
             # Industry preferences
-            if lead.company.industry in ["SaaS", "FinTech"]:
+            if industry_bucket == "technical":
                 if template.tone == ToneStyle.TECHNICAL:
                     score += 15
                 elif template.tone == ToneStyle.FORMAL:
                     score += 10
-            elif lead.company.industry in ["Healthcare", "Manufacturing"]:
+            elif industry_bucket == "regulated":
                 if template.tone == ToneStyle.FORMAL:
                     score += 15
                 elif template.tone == ToneStyle.EXECUTIVE:
                     score += 10
             
             # Title/seniority preferences
-            if "C-Level" in lead.contact.seniority:
+            if role_bucket == "c_level":
                 if template.tone == ToneStyle.EXECUTIVE:
                     score += 25
                 elif template.tone == ToneStyle.FORMAL:
                     score += 15
-            elif "VP" in lead.contact.title:
+            elif role_bucket == "vp":
                 if template.tone == ToneStyle.FORMAL:
                     score += 20
                 elif template.tone == ToneStyle.EXECUTIVE:
                     score += 15
-            elif "Director" in lead.contact.title:
+            elif role_bucket == "director":
                 if template.tone == ToneStyle.FORMAL:
                     score += 20
                 elif template.tone == ToneStyle.CASUAL:
                     score += 10
             
             # Company size preferences
-            if lead.company.employee_count > 1000:
+            if size_bucket == "enterprise":
                 if template.tone == ToneStyle.EXECUTIVE:
                     score += 10
                 elif template.tone == ToneStyle.FORMAL:
                     score += 5
-            elif lead.company.employee_count < 100:
+            elif size_bucket == "small":
                 if template.tone == ToneStyle.CASUAL:
                     score += 10
                 elif template.tone == ToneStyle.FORMAL:
                     score += 5
             
             # Tone preference from config
-            if config.tone and template.tone == config.tone:
+            if tone and template.tone == tone:
                 score += 30
             
             template_scores.append((template.id, score))
@@ -1379,7 +2389,7 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
                 
                 if result["success"]:
                     # Update lead with tracking information
-                    await self._update_lead_tracking(lead, message, result)
+                    await self._enqueue_lead_tracking(lead, message, result)
                     
                     return {
                         "success": True,
@@ -1426,12 +2436,39 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
                 "message_id": message.message_id
             }
     
+    async def send_real_email_batch(
+        self,
+        pairs: List[Tuple[OutreachMessage, Lead]],
+        max_concurrency: int = 10,
+        send_immediately: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Send many emails concurrently, capped at max_concurrency in flight
+        
+        Args:
+            pairs: (message, lead) pairs to send
+            max_concurrency: Maximum concurrent Gmail API calls
+            send_immediately: If True, send now; if False, add to queue
+            
+        Returns:
+            One send_real_email result per pair, in input order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def send_one(message: OutreachMessage, lead: Lead) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.send_real_email(message, lead, send_immediately=send_immediately)
+        
+        return list(await asyncio.gather(*(send_one(message, lead) for message, lead in pairs)))
+    
     def _convert_to_html(self, text_body: str, lead: Lead) -> str:
         """Convert text email to HTML with proper formatting"""
         
-        # Escape HTML characters
-        import html
-        escaped_text = html.escape(text_body)
+        # Escape HTML characters (plain-text bodies usually have none)
+        if _HTML_SPECIAL_RE.search(text_body):
+            escaped_text = html.escape(text_body)
+        else:
+            escaped_text = text_body
         
         # Convert line breaks to <br> tags
         html_body = escaped_text.replace('\n\n', '</p><p>').replace('\n', '<br>')
@@ -1439,153 +2476,180 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
         # Wrap in paragraphs
         html_body = f'<p>{html_body}</p>'
         
-        # Create full HTML email template
-        html_template = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1">
-            <title>{lead.company.name} - Outreach</title>
-            <style>
-                body {{
-                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                    margin: 0;
-                    padding: 20px;
-                    background-color: #f9f9f9;
-                }}
-                .email-container {{
-                    max-width: 600px;
-                    margin: 0 auto;
-                    background-color: white;
-                    padding: 30px;
-                    border-radius: 8px;
-                    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                }}
-                .email-header {{
-                    border-bottom: 2px solid #f0f0f0;
-                    padding-bottom: 20px;
-                    margin-bottom: 30px;
-                }}
-                .email-content {{
-                    font-size: 16px;
-                    line-height: 1.7;
-                }}
-                .email-content p {{
-                    margin: 0 0 20px 0;
-                }}
-                .email-footer {{
-                    margin-top: 40px;
-                    padding-top: 20px;
-                    border-top: 1px solid #eee;
-                    font-size: 14px;
-                    color: #666;
-                    text-align: center;
-                }}
-                .signature {{
-                    margin-top: 30px;
-                    padding-top: 20px;
-                    border-top: 1px solid #f0f0f0;
-                    font-size: 14px;
-                    color: #666;
-                }}
-                a {{
-                    color: #0066cc;
-                    text-decoration: none;
-                }}
-                a:hover {{
-                    text-decoration: underline;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="email-container">
-                <div class="email-header">
-                    <h2 style="margin: 0; color: #333;">Personal Message for {lead.contact.first_name}</h2>
-                </div>
-                
-                <div class="email-content">
-                    {html_body}
-                </div>
-                
-                <div class="signature">
-                    <p><strong>{self.config.get('sender_name', 'Sales Team')}</strong><br>
-                    {self.config.get('sender_title', 'Account Executive')}<br>
-                    {self.config.get('sender_company', 'Our Company')}<br>
-                    {self.config.get('sender_phone', '')}</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html_template
+        # Fill the shared HTML email template
+        return _EMAIL_HTML_TEMPLATE.substitute(
+            company_name=lead.company.name,
+            first_name=lead.contact.first_name,
+            html_body=html_body,
+            signature=self._signature_html
+        )
     
     def _generate_unsubscribe_url(self, lead: Lead, message_id: str) -> str:
         """Generate unique unsubscribe URL for the lead"""
         
         # Create unique token for unsubscribe
-        import hashlib
         token_data = f"{lead.lead_id}:{message_id}:{lead.contact.email}"
-        token = hashlib.sha256(token_data.encode()).hexdigest()[:16]
+        key = self._unsubscribe_key or _get_fallback_unsubscribe_key()
+        token = hashlib.blake2b(token_data.encode(), digest_size=8, key=key).hexdigest()
         
-        base_url = self.config.get('base_url', 'https://localhost:8000')
-        return f"{base_url}/api/unsubscribe/{token}"
+        return f"{self._unsubscribe_base_url}/api/unsubscribe/{token}"
+    
+    async def _enqueue_lead_tracking(self, lead: Lead, message: OutreachMessage, send_result: Dict):
+        """Hand tracking to the background worker, or write it inline before start()"""
+        # Stamp the send now; the worker may flush it much later
+        sent_at = datetime.now()
+        if self._tracking_queue is None:
+            await self._update_lead_tracking(lead, message, send_result, sent_at)
+        else:
+            await self._tracking_queue.put((lead, message, send_result, sent_at))
+    
+    async def _tracking_consumer(self):
+        """Drain the tracking queue, flushing whatever is waiting in one batch"""
+        queue = self._tracking_queue
+        while True:
+            entries = [await queue.get()]
+            while len(entries) < _TRACKING_BATCH_SIZE and not queue.empty():
+                entries.append(queue.get_nowait())
+            try:
+                await self._update_lead_tracking_batch(entries)
+            finally:
+                for _ in entries:
+                    queue.task_done()
     
-    async def _update_lead_tracking(self, lead: Lead, message: OutreachMessage, send_result: Dict):
+    async def _update_lead_tracking(
+        self,
+        lead: Lead,
+        message: OutreachMessage,
+        send_result: Dict,
+        sent_at: Optional[datetime] = None
+    ):
         """Update lead with email tracking information"""
         
         if not self.redis_client:
             return
         
         try:
-            # Store lead-message mapping for tracking
-            tracking_data = {
-                "lead_id": lead.lead_id,
-                "message_id": message.message_id,
-                "gmail_id": send_result.get("gmail_id"),
-                "thread_id": send_result.get("thread_id"),
-                "sent_at": datetime.now().isoformat(),
-                "subject": message.subject,
-                "recipient": lead.contact.email,
-                "contact_name": lead.contact.full_name,
-                "company_name": lead.company.name,
-                "lead_score": lead.score.total_score
-            }
-            
-            # Store in Redis for 30 days
-            tracking_key = f"outreach_tracking:{message.message_id}"
-            await self.redis_client.setex(
-                tracking_key,
-                timedelta(days=30),
-                json.dumps(tracking_data)
-            )
+            # Queue every write on one pipeline so the update costs a single
+            # round-trip instead of four
+            pipe = self.redis_client.pipeline(transaction=False)
+            await self._queue_lead_tracking(pipe, lead, message, send_result, sent_at or datetime.now())
+            await pipe.execute()
             
-            # Update lead's email history
-            lead_history_key = f"lead_emails:{lead.lead_id}"
-            email_entry = {
-                "message_id": message.message_id,
-                "sent_at": datetime.now().isoformat(),
-                "subject": message.subject,
-                "gmail_id": send_result.get("gmail_id")
-            }
+        except Exception as e:
+            self.logger.error(f"Failed to update lead tracking: {e}")
+    
+    async def _update_lead_tracking_batch(self, entries: List[Tuple[Lead, OutreachMessage, Dict, datetime]]):
+        """Update tracking for many sent emails in one Redis round-trip"""
+        
+        if not self.redis_client or not entries:
+            return
+        
+        try:
+            # History updates go on the pipeline per lead; the tracking keys
+            # are collected and written by one script call
+            pipe = self.redis_client.pipeline(transaction=False)
+            tracking_writes: List[Tuple[str, Any]] = []
+            for lead, message, send_result, sent_at in entries:
+                await self._queue_lead_tracking(pipe, lead, message, send_result, sent_at, tracking_writes)
             
-            # Add to lead's email history (keep last 50 emails)
-            await self.redis_client.lpush(lead_history_key, json.dumps(email_entry))
-            await self.redis_client.ltrim(lead_history_key, 0, 49)
-            await self.redis_client.expire(lead_history_key, timedelta(days=90))
+            if self._bulk_tracking_script is None:
+                self._bulk_tracking_script = self.redis_client.register_script(_BULK_TRACKING_SCRIPT)
+            await self._bulk_tracking_script(
+                keys=[key for key, _ in tracking_writes],
+                args=[_TRACKING_TTL] + [payload for _, payload in tracking_writes],
+                client=pipe
+            )
+            await pipe.execute()
             
         except Exception as e:
             self.logger.error(f"Failed to update lead tracking: {e}")
     
+    async def _queue_lead_tracking(
+        self,
+        pipe,
+        lead: Lead,
+        message: OutreachMessage,
+        send_result: Dict,
+        sent: datetime,
+        tracking_writes: Optional[List[Tuple[str, Any]]] = None
+    ):
+        """
+        Add the tracking writes for one sent email to a Redis pipeline.
+        
+        sent is when the email went out. When tracking_writes is given, the
+        tracking key and payload are appended to it for a bulk write instead
+        of being queued as a SETEX.
+        """
+        sent_at = sent.isoformat()
+        sent_ts = sent.timestamp()
+        
+        # Store lead-message mapping for tracking
+        tracking_data = {
+            "lead_id": lead.lead_id,
+            "message_id": message.message_id,
+            "gmail_id": send_result.get("gmail_id"),
+            "thread_id": send_result.get("thread_id"),
+            "sent_at": sent_at,
+            "subject": message.subject,
+            "recipient": lead.contact.email,
+            "contact_name": lead.contact.full_name,
+            "company_name": lead.company.name,
+            "lead_score": lead.score.total_score
+        }
+        
+        # Store in Redis for 30 days; a cached status for this message is stale
+        tracking_key = f"outreach_tracking:{message.message_id}"
+        self._status_cache.pop(message.message_id, None)
+        if tracking_writes is None:
+            pipe.setex(
+                tracking_key,
+                _TRACKING_TTL,
+                _json_dumps(tracking_data)
+            )
+        else:
+            tracking_writes.append((tracking_key, _json_dumps(tracking_data)))
+        
+        # Update lead's email history
+        lead_history_key = f"lead_emails:{lead.lead_id}"
+        email_entry = {
+            "message_id": message.message_id,
+            "sent_at": sent_at,
+            "subject": message.subject,
+            "gmail_id": send_result.get("gmail_id")
+        }
+        
+        # Add to lead's email history (keep last 50 emails from the last 90 days).
+        # Older list-based histories hold naive local sent_at strings; the
+        # local UTC offset lets the script turn them into timestamps.
+        local_offset = datetime.fromtimestamp(sent_ts).replace(tzinfo=timezone.utc).timestamp() - sent_ts
+        if self._history_script is None:
+            self._history_script = self.redis_client.register_script(_HISTORY_SCRIPT)
+        await self._history_script(
+            keys=[lead_history_key],
+            args=[
+                _json_dumps(email_entry),
+                sent_ts,
+                sent_ts - _HISTORY_TTL,
+                _HISTORY_TTL,
+                local_offset
+            ],
+            client=pipe
+        )
+    
     async def get_email_status(self, message_id: str) -> Optional[Dict[str, Any]]:
         """Get email sending and tracking status"""
         
         if not self.gmail_client or not self.redis_client:
             return None
         
+        cached = self._status_cache.get(message_id)
+        if cached is not None:
+            expires_at, status = cached
+            if expires_at > time.monotonic():
+                self._status_cache.move_to_end(message_id)
+                return dict(status)
+            del self._status_cache[message_id]
+        
         try:
             # Get tracking data
             tracking_key = f"outreach_tracking:{message_id}"
@@ -1594,24 +2658,36 @@ Format as JSON with keys: probability, strengths, weaknesses, improvement"""
             if not tracking_data:
                 return None
             
-            tracking_info = json.loads(tracking_data)
+            tracking_info = _json_loads(tracking_data)
             
-            # Get Gmail tracking summary (if available)
+            # Get Gmail tracking summary (if available); look up every tracking
+            # id concurrently and keep the first one that has a summary
             gmail_summary = None
             if "tracking_ids" in tracking_info:
-                for tracking_id in tracking_info["tracking_ids"]:
-                    summary = await self.gmail_client.get_tracking_summary(tracking_id)
-                    if summary:
-                        gmail_summary = summary
-                        break
+                summaries = await asyncio.gather(
+                    *(self.gmail_client.get_tracking_summary(tracking_id)
+                      for tracking_id in tracking_info["tracking_ids"]),
+                    return_exceptions=True
+                )
+                gmail_summary = next(
+                    (summary for summary in summaries if summary and not isinstance(summary, Exception)),
+                    None
+                )
             
-            return {
+            status = {
                 "message_id": message_id,
                 "tracking_info": tracking_info,
                 "gmail_tracking": gmail_summary,
                 "status": "sent" if tracking_info.get("gmail_id") else "queued"
             }
             
+            self._status_cache[message_id] = (time.monotonic() + _STATUS_CACHE_TTL, status)
+            self._status_cache.move_to_end(message_id)
+            if len(self._status_cache) > _STATUS_CACHE_SIZE:
+                self._status_cache.popitem(last=False)
+            
+            return dict(status)
+            
         except Exception as e:
             self.logger.error(f"Failed to get email status: {e}")
             return None
@@ -4,18 +4,80 @@ Test suite for AI-enhanced Outreach Composer
 """
 import asyncio
 import sys
-import os
+from pathlib import Path
 import json
 import time
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+import functools
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, List
+# JarvisAlive root, for the ai_engines and database packages
+_PROJECT_ROOT = str(Path(__file__).resolve().parents[3])
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
 
-from outreach_composer_implementation import OutreachComposerAgent, OutreachConfig, ToneStyle
+from outreach_composer_implementation import OutreachComposerAgent, OutreachConfig, ToneStyle, close_cached_engines
 from lead_scanner_implementation import Lead, LeadScore, ScanCriteria
+from buffered_output import gather_buffered
 from database.mock_data import Company, Contact
+from ai_engines.base_engine import AIEngineConfig
+from ai_engines.mock_engine import MockAIEngine
 
-# Create test data
-def create_test_lead(score: int = 85) -> Lead:
-    """Create a test lead with mock data"""
+# Lightweight duck-typed stand-ins for data the composer reads by attribute
+@dataclass
+class _NewsItem:
+    title: str
+    date: str = ''
+
+@dataclass
+class _MinimalCompany:
+    name: str
+    industry: str
+    employee_count: int
+    pain_points: List[str] = field(default_factory=list)
+
+@dataclass
+class _MinimalContact:
+    first_name: str
+    last_name: str
+    full_name: str
+    title: str
+    email: str
+
+@dataclass
+class _MinimalLead:
+    lead_id: str
+    company: Any
+    contact: Any
+    score: Any
+
+# Create test data. One canonical lead is built on first use; create_test_lead
+# returns shallow copies that only vary the score and enrichment data.
+_NEWS_ITEM = _NewsItem(
+    title='TechCorp Raises $50M Series B Funding',
+    date='2024-01-15'
+)
+
+# Shared by every high-score test lead; readers never mutate it
+_ENRICHMENT_DATA = {
+    "company_insights": {
+        "priorities": ["Scaling operations", "Market expansion"],
+        "pain_points": ["Need better automation", "Customer retention"],
+        "timing": "optimal",
+        "approach_angle": "ROI-focused"
+    },
+    "contact_insights": {
+        "responsibilities": ["Drive revenue growth", "Manage sales team"],
+        "challenges": ["Team productivity", "Pipeline visibility"],
+        "communication_style": "direct",
+        "best_channel": "email"
+    },
+    "ai_provider": "mock"
+}
+
+@functools.lru_cache(maxsize=None)
+def _base_lead() -> Lead:
+    """Build the canonical test lead with mock data"""
     company = Company(
         id="comp_test_123",
         name="TechCorp Solutions",
@@ -25,12 +87,7 @@ def create_test_lead(score: int = 85) -> Lead:
         employee_count=250,
         location="San Francisco, CA",
         description="Leading provider of marketing automation software",
-        recent_news=[
-            type('NewsItem', (), {
-                'title': 'TechCorp Raises $50M Series B Funding',
-                'date': '2024-01-15'
-            })()
-        ],
+        recent_news=[_NEWS_ITEM],
         technologies=["React", "Python", "AWS", "Kubernetes"],
         pain_points=["Scaling customer acquisition", "Improving retention rates", "Automating workflows"]
     )
@@ -51,7 +108,7 @@ def create_test_lead(score: int = 85) -> Lead:
     )
     
     lead_score = LeadScore(
-        total_score=score,
+        total_score=85,
         industry_match=25,
         title_relevance=30,
         company_size_fit=15,
@@ -60,7 +117,7 @@ def create_test_lead(score: int = 85) -> Lead:
         confidence=0.85
     )
     
-    lead = Lead(
+    return Lead(
         lead_id="lead_test_789",
         contact=contact,
         company=company,
@@ -69,26 +126,50 @@ def create_test_lead(score: int = 85) -> Lead:
         source="mock_test",
         outreach_priority="high"
     )
-    
-    # Add AI enrichment data for some tests
-    if score >= 80:
-        lead.enrichment_data = {
-            "company_insights": {
-                "priorities": ["Scaling operations", "Market expansion"],
-                "pain_points": ["Need better automation", "Customer retention"],
-                "timing": "optimal",
-                "approach_angle": "ROI-focused"
-            },
-            "contact_insights": {
-                "responsibilities": ["Drive revenue growth", "Manage sales team"],
-                "challenges": ["Team productivity", "Pipeline visibility"],
-                "communication_style": "direct",
-                "best_channel": "email"
-            },
-            "ai_provider": "mock"
-        }
-    
-    return lead
+
+def create_test_lead(score: int = 85) -> Lead:
+    """Create a test lead with the given score"""
+    base = _base_lead()
+    return base.copy(update={
+        "score": base.score.copy(update={"total_score": score}),
+        # Add AI enrichment data for some tests
+        "enrichment_data": _ENRICHMENT_DATA if score >= 80 else None
+    })
+
+# One mock engine backs every shared agent, so its budget covers the whole run.
+# Configured like the engine OutreachComposerAgent would build itself.
+SHARED_MOCK_ENGINE = MockAIEngine(AIEngineConfig(
+    model="claude-3-sonnet-20240229",
+    max_tokens=800,
+    temperature=0.7,
+    cache_ttl_seconds=3600
+), deterministic=False)
+
+# Agents shared by the suites that neither tune their AI engine nor read its
+# counters, so each mode is constructed once per run
+_AGENTS = {}
+
+def get_agent(mode: str, ai_provider: str = "mock") -> OutreachComposerAgent:
+    """Return the shared agent for a mode, creating it on first use"""
+    key = (mode, ai_provider)
+    agent = _AGENTS.get(key)
+    if agent is None:
+        agent = _AGENTS[key] = OutreachComposerAgent(
+            mode=mode,
+            config={"ai_provider": ai_provider},
+            ai_engine=SHARED_MOCK_ENGINE if ai_provider == "mock" else None
+        )
+    return agent
+
+async def close_agents():
+    """Release every shared agent, the shared mock engine and any cached AI engines"""
+    for agent in _AGENTS.values():
+        await agent.aclose()
+    _AGENTS.clear()
+    engine_close = getattr(SHARED_MOCK_ENGINE, "aclose", None)
+    if engine_close is not None:
+        await engine_close()
+    await close_cached_engines()
 
 async def test_template_mode():
     """Test traditional template mode"""
@@ -107,7 +188,7 @@ async def test_template_mode():
         }
     )
     
-    agent = OutreachComposerAgent(mode="template")
+    agent = get_agent("template")
     lead = create_test_lead(70)
     
     message = await agent.compose_outreach(lead, config)
@@ -142,6 +223,7 @@ async def test_ai_mode():
         "ai_model": "mock-ai-sales"
     }
     
+    # Own agent: this suite exercises a specific model config
     agent = OutreachComposerAgent(mode="ai", config=ai_config)
     lead = create_test_lead(90)
     
@@ -175,8 +257,7 @@ async def test_hybrid_mode():
         }
     )
     
-    ai_config = {"ai_provider": "mock"}
-    agent = OutreachComposerAgent(mode="hybrid", config=ai_config)
+    agent = get_agent("hybrid")
     
     # Test with high-value lead (should use AI)
     print("1. High-value lead (score 85):")
@@ -207,7 +288,7 @@ async def test_ab_variations():
         }
     )
     
-    agent = OutreachComposerAgent(mode="ai", config={"ai_provider": "mock"})
+    agent = get_agent("ai")
     lead = create_test_lead(90)
     
     # Generate message with variations
@@ -237,7 +318,7 @@ async def test_response_prediction():
     print("=" * 50)
     
     config = OutreachConfig(sender_info={"name": "Test Sender"})
-    agent = OutreachComposerAgent(mode="ai", config={"ai_provider": "mock"})
+    agent = get_agent("ai")
     
     # Test different message qualities
     test_cases = [
@@ -257,13 +338,16 @@ async def test_response_prediction():
         }
     ]
     
-    for i, test in enumerate(test_cases):
+    # Get AI predictions for every case from one call
+    predictions = await agent._predict_response_rate_ai_batch(
+        [test["message"] for test in test_cases],
+        [test["lead"] for test in test_cases]
+    )
+    
+    for i, (test, prediction) in enumerate(zip(test_cases, predictions)):
         lead = test["lead"]
         message = test["message"]
         
-        # Get AI prediction
-        prediction = await agent._predict_response_rate_ai(message, lead)
-        
         print(f"\nTest {i+1}:")
         print(f"  Lead score: {lead.score.total_score}")
         print(f"  Subject: {message['subject']}")
@@ -279,7 +363,7 @@ async def test_quality_checks():
     print("✅ Testing Quality Checks")
     print("=" * 50)
     
-    agent = OutreachComposerAgent(mode="ai", config={"ai_provider": "mock"})
+    agent = get_agent("ai")
     lead = create_test_lead(80)
     
     # Test different message qualities
@@ -302,10 +386,17 @@ async def test_quality_checks():
         }
     ]
     
-    for test in test_messages:
+    # The checks are independent, so run them together under a small cap
+    semaphore = asyncio.Semaphore(8)
+    
+    async def run_check(content):
+        async with semaphore:
+            return await agent._quality_check_ai_message(content, lead)
+    
+    results = await asyncio.gather(*(run_check(test['content']) for test in test_messages))
+    
+    for test, result in zip(test_messages, results):
         print(f"\nTesting: {test['name']}")
-        result = await agent._quality_check_ai_message(test['content'], lead)
-        
         print(f"  Overall: {'✅ Passed' if result['passed'] else '❌ Failed'}")
         for check, passed in result['checks'].items():
             status = "✅" if passed else "❌"
@@ -325,23 +416,23 @@ async def test_performance():
         sender_info={"name": "Performance Test"}
     )
     
+    # Own agent: the budget counters printed below must cover only this suite
     agent = OutreachComposerAgent(mode="hybrid", config={"ai_provider": "mock"})
     
     # Generate messages for multiple leads
     leads = [create_test_lead(score) for score in [90, 85, 80, 75, 70, 65, 60]]
     
+    # Compose every lead concurrently so AI latency overlaps
     start_time = time.time()
-    messages = []
+    messages = await agent.compose_batch(leads, config)
+    total_time = time.time() - start_time
     
-    for i, lead in enumerate(leads):
-        msg = await agent.compose_outreach(lead, config)
-        messages.append(msg)
+    for i, (lead, msg) in enumerate(zip(leads, messages)):
         print(f"Lead {i+1}: {msg.generation_mode} mode, score: {lead.score.total_score}")
     
-    total_time = time.time() - start_time
-    
-    ai_messages = sum(1 for m in messages if m.generation_mode == "ai")
-    template_messages = sum(1 for m in messages if m.generation_mode == "template")
+    mode_counts = Counter(m.generation_mode for m in messages)
+    ai_messages = mode_counts["ai"]
+    template_messages = mode_counts["template"]
     
     print(f"\nResults:")
     print(f"  Total messages: {len(messages)}")
@@ -366,20 +457,19 @@ async def test_edge_cases():
     
     # Test with minimal lead data
     print("1. Minimal lead data:")
-    minimal_company = type('Company', (), {
-        'name': 'Unknown Corp',
-        'industry': 'Unknown',
-        'employee_count': 0,
-        'pain_points': []
-    })()
-    
-    minimal_contact = type('Contact', (), {
-        'first_name': 'John',
-        'last_name': 'Doe',
-        'full_name': 'John Doe',
-        'title': 'Employee',
-        'email': 'john@example.com'
-    })()
+    minimal_company = _MinimalCompany(
+        name='Unknown Corp',
+        industry='Unknown',
+        employee_count=0
+    )
+    
+    minimal_contact = _MinimalContact(
+        first_name='John',
+        last_name='Doe',
+        full_name='John Doe',
+        title='Employee',
+        email='john@example.com'
+    )
     
     minimal_score = LeadScore(
         total_score=50,
@@ -391,15 +481,15 @@ async def test_edge_cases():
         confidence=0.5
     )
     
-    minimal_lead = type('Lead', (), {
-        'lead_id': 'lead_minimal',
-        'company': minimal_company,
-        'contact': minimal_contact,
-        'score': minimal_score
-    })()
+    minimal_lead = _MinimalLead(
+        lead_id='lead_minimal',
+        company=minimal_company,
+        contact=minimal_contact,
+        score=minimal_score
+    )
     
     try:
-        agent = OutreachComposerAgent(mode="ai", config={"ai_provider": "mock"})
+        agent = get_agent("ai")
         message = await agent.compose_outreach(minimal_lead, config)
         print(f"✅ Handled minimal data: {message.subject}")
     except Exception as e:
@@ -407,6 +497,7 @@ async def test_edge_cases():
     
     # Test AI fallback
     print("\n2. AI engine failure fallback:")
+    # Own agent: forcing failures must not leak into concurrently running suites
     agent = OutreachComposerAgent(mode="hybrid", config={"ai_provider": "mock"})
     if agent.ai_engine:
         agent.ai_engine.set_failure_rate(1.0)  # Force failures
@@ -429,15 +520,28 @@ async def main():
     print("Testing AI-powered email generation and personalization\n")
     
     try:
-        # Run all test suites
-        await test_template_mode()
-        await test_ai_mode()
-        await test_hybrid_mode()
-        await test_ab_variations()
-        await test_response_prediction()
-        await test_quality_checks()
-        await test_performance()
-        await test_edge_cases()
+        # Run all test suites concurrently. Most share the per-mode agents from
+        # get_agent, which they don't modify; suites that configure their agent,
+        # tune its engine or read its counters build their own. Each suite's
+        # output is buffered and printed in order once everything finishes.
+        suites = (
+            test_template_mode,
+            test_ai_mode,
+            test_hybrid_mode,
+            test_ab_variations,
+            test_response_prediction,
+            test_quality_checks,
+            test_performance,
+            test_edge_cases
+        )
+        for output, result in await gather_buffered(suites):
+            print(output, end="")
+            if isinstance(result, Exception):
+                raise result
+        
+        budget = SHARED_MOCK_ENGINE.get_budget_info()
+        print(f"Shared mock engine: {budget.requests_made} AI requests, "
+              f"{budget.input_tokens_used + budget.output_tokens_used} tokens\n")
         
         print("🎉 All tests completed successfully!")
         print("\nKey Features Demonstrated:")
@@ -456,6 +560,14 @@ async def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        await close_agents()
 
 if __name__ == "__main__":
+    # uvloop schedules the many mock-AI awaits faster; optional
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())
\ No newline at end of file
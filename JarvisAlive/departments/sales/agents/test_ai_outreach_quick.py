@@ -4,8 +4,11 @@ Quick test for AI-enhanced Outreach Composer
 """
 import asyncio
 import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from pathlib import Path
+# JarvisAlive root, for the ai_engines and database packages
+_PROJECT_ROOT = str(Path(__file__).resolve().parents[3])
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
 
 from outreach_composer_implementation import OutreachComposerAgent, OutreachConfig, ToneStyle
 
@@ -140,4 +143,10 @@ async def quick_test():
         print(f"\nBudget: ${budget.total_spent_usd:.4f}, {budget.requests_made} requests")
 
 if __name__ == "__main__":
+    # uvloop schedules the many mock-AI awaits faster; optional
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(quick_test())
\ No newline at end of file
@@ -4,8 +4,11 @@ Test script for Lead Scanner Agent Implementation
 """
 import asyncio
 import sys
-import os
-sys.path.append('/Users/avisanghavi/Desktop/ProjectSpace_Jarvis/Jarvolution/Hey..J/JarvisAlive')
+from pathlib import Path
+
+_PROJECT_ROOT = str(Path(__file__).resolve().parents[3])
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
 
 from lead_scanner_implementation import LeadScannerAgent, ScanCriteria
 
@@ -20,11 +23,7 @@ async def test_lead_scanner():
     agent = LeadScannerAgent(mode="mock")
     
     # Test 1: Basic scan
-    print("\n📊 Test 1: Basic scan with default criteria")
-    criteria = ScanCriteria(min_score=50, max_results=10)
-    
-    try:
-        leads = await agent.scan_for_leads(criteria)
+    def report_basic(leads):
         print(f"✅ Found {len(leads)} leads")
         
         if leads:
@@ -33,68 +32,82 @@ async def test_lead_scanner():
             print(f"   Score: {top_lead.score.total_score}")
             print(f"   Priority: {top_lead.outreach_priority}")
             print(f"   Explanation: {top_lead.score.explanation}")
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
     
     # Test 2: Industry-specific scan
-    print("\n🏭 Test 2: SaaS industry scan")
-    criteria = ScanCriteria(
-        industries=["SaaS"],
-        min_score=60,
-        max_results=5
-    )
-    
-    try:
-        leads = await agent.scan_for_leads(criteria)
+    def report_industry(leads):
         print(f"✅ Found {len(leads)} SaaS leads")
         
         for lead in leads[:3]:
             print(f"   - {lead.contact.full_name} ({lead.contact.title}) at {lead.company.name}")
             print(f"     Score: {lead.score.total_score} | Industry: {lead.score.industry_match}")
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
     
     # Test 3: Title-specific scan
-    print("\n👔 Test 3: VP-level scan")
-    criteria = ScanCriteria(
-        titles=["VP", "Vice President"],
-        min_score=55,
-        max_results=8
-    )
-    
-    try:
-        leads = await agent.scan_for_leads(criteria)
+    def report_title(leads):
         print(f"✅ Found {len(leads)} VP-level leads")
         
         for lead in leads[:3]:
             print(f"   - {lead.contact.full_name} ({lead.contact.title}) at {lead.company.name}")
             print(f"     Score: {lead.score.total_score} | Title: {lead.score.title_relevance}")
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
     
     # Test 4: Combined criteria
-    print("\n🎯 Test 4: Combined criteria (SaaS + VP + High score)")
-    criteria = ScanCriteria(
-        industries=["SaaS", "FinTech"],
-        titles=["VP", "Director", "Chief"],
-        min_score=70,
-        max_results=3
-    )
-    
-    try:
-        leads = await agent.scan_for_leads(criteria)
+    def report_combined(leads):
         print(f"✅ Found {len(leads)} high-quality leads")
         
         for lead in leads:
             print(f"   - {lead.contact.full_name} ({lead.contact.title}) at {lead.company.name}")
             print(f"     Score: {lead.score.total_score} | Priority: {lead.outreach_priority}")
             print(f"     Breakdown: Industry={lead.score.industry_match}, Title={lead.score.title_relevance}")
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
+    
+    cases = [
+        (
+            "\n📊 Test 1: Basic scan with default criteria",
+            ScanCriteria(min_score=50, max_results=10),
+            report_basic
+        ),
+        (
+            "\n🏭 Test 2: SaaS industry scan",
+            ScanCriteria(
+                industries=["SaaS"],
+                min_score=60,
+                max_results=5
+            ),
+            report_industry
+        ),
+        (
+            "\n👔 Test 3: VP-level scan",
+            ScanCriteria(
+                titles=["VP", "Vice President"],
+                min_score=55,
+                max_results=8
+            ),
+            report_title
+        ),
+        (
+            "\n🎯 Test 4: Combined criteria (SaaS + VP + High score)",
+            ScanCriteria(
+                industries=["SaaS", "FinTech"],
+                titles=["VP", "Director", "Chief"],
+                min_score=70,
+                max_results=3
+            ),
+            report_combined
+        )
+    ]
+    
+    # The scans are independent, so run them together and report in order
+    results = await asyncio.gather(
+        *(agent.scan_for_leads(criteria) for _, criteria, _ in cases),
+        return_exceptions=True
+    )
+    
+    for (header, _, report), result in zip(cases, results):
+        print(header)
+        try:
+            if isinstance(result, Exception):
+                raise result
+            report(result)
+        except Exception as e:
+            print(f"❌ Error: {e}")
     
     print("\n🎉 Lead Scanner Agent test completed!")
 
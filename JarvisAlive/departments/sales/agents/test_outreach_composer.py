@@ -3,13 +3,39 @@
 Test script for Outreach Composer Implementation
 """
 import asyncio
+import functools
 import sys
 import os
+from typing import Dict, Tuple
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from outreach_composer_implementation import OutreachComposerAgent, OutreachConfig, ToneStyle
+from outreach_composer_implementation import OutreachComposerAgent, OutreachConfig, OutreachMessage, ToneStyle
 from lead_scanner_implementation import LeadScannerAgent, ScanCriteria
+from buffered_output import buffered_stdout
+
+
+@functools.lru_cache(maxsize=None)
+def get_composer(mode: str = "template") -> OutreachComposerAgent:
+    """Return the shared composer for a mode, creating it on first use"""
+    return OutreachComposerAgent(mode=mode)
+
+
+# Messages composed in this run, keyed by the lead and every config field that
+# shapes the message, sender details included since they appear in the body
+_MESSAGE_CACHE: Dict[Tuple, OutreachMessage] = {}
+
+
+async def compose_cached(composer: OutreachComposerAgent, lead, config: OutreachConfig,
+                         **kwargs) -> OutreachMessage:
+    """Compose a message once per lead and config, answering repeats from memory"""
+    key = (lead.lead_id, config.category, config.tone, config.personalization_depth,
+           config.max_length, config.include_calendar_link,
+           tuple(sorted(config.sender_info.items())))
+    message = _MESSAGE_CACHE.get(key)
+    if message is None:
+        message = _MESSAGE_CACHE[key] = await composer.compose_outreach(lead, config, **kwargs)
+    return message
 
 
 async def test_outreach_composer():
@@ -20,7 +46,7 @@ async def test_outreach_composer():
     
     # Initialize agents
     lead_scanner = LeadScannerAgent(mode="mock")
-    outreach_composer = OutreachComposerAgent(mode="template")
+    outreach_composer = get_composer()
     
     # Get some leads to test with
     criteria = ScanCriteria(
@@ -37,10 +63,16 @@ async def test_outreach_composer():
         print("❌ No leads found for testing")
         return
     
+    # Personalization variables are fixed per lead, so extract them once
+    lead_vars = {
+        lead.lead_id: outreach_composer._extract_personalization_variables(lead)
+        for lead in leads
+    }
+    
     # Test 1: Basic template composition
     print("\n📝 Test 1: Basic template composition")
     lead = leads[0]
-    config = OutreachConfig(
+    basic_config = OutreachConfig(
         category="cold_outreach",
         tone=ToneStyle.FORMAL,
         sender_info={
@@ -51,7 +83,9 @@ async def test_outreach_composer():
     )
     
     try:
-        message = await outreach_composer.compose_outreach(lead, config)
+        message = await compose_cached(
+            outreach_composer, lead, basic_config, precomputed_vars=lead_vars[lead.lead_id]
+        )
         print(f"✅ Generated message for {lead.contact.full_name} at {lead.company.name}")
         print(f"   Subject: {message.subject}")
         print(f"   Body length: {len(message.body.split())} words")
@@ -69,23 +103,33 @@ async def test_outreach_composer():
     except Exception as e:
         print(f"❌ Error: {e}")
     
+    sys.stdout.flush()
+    
+    # Tests 2, 3, 4 and 6 compose each sweep concurrently and report in order.
+    # Sweeps vary one field of a base config; the copies share its sender_info.
+    
     # Test 2: Different tone styles
     print("\n🎨 Test 2: Testing different tone styles")
     
     tones = [ToneStyle.CASUAL, ToneStyle.TECHNICAL, ToneStyle.EXECUTIVE]
-    for tone in tones:
-        config = OutreachConfig(
-            category="cold_outreach",
-            tone=tone,
-            sender_info={
-                "sender_name": "Jane Doe",
-                "sender_title": "Sales Engineer",
-                "sender_company": "TechSolutions"
-            }
-        )
-        
+    base_config = OutreachConfig(
+        category="cold_outreach",
+        sender_info={
+            "sender_name": "Jane Doe",
+            "sender_title": "Sales Engineer",
+            "sender_company": "TechSolutions"
+        }
+    )
+    configs = [base_config.copy(update={"tone": tone}) for tone in tones]
+    messages = await asyncio.gather(*(
+        outreach_composer.compose_outreach(lead, config, precomputed_vars=lead_vars[lead.lead_id])
+        for config in configs
+    ), return_exceptions=True)
+    
+    for tone, message in zip(tones, messages):
         try:
-            message = await outreach_composer.compose_outreach(lead, config)
+            if isinstance(message, Exception):
+                raise message
             print(f"✅ {tone.value.upper()} tone - Template: {message.template_id}")
             print(f"   Subject: {message.subject}")
             print(f"   Personalization: {message.personalization_score:.2f}")
@@ -93,22 +137,29 @@ async def test_outreach_composer():
         except Exception as e:
             print(f"❌ {tone.value} tone error: {e}")
     
+    sys.stdout.flush()
+    
     # Test 3: Different categories
     print("\n📂 Test 3: Testing different categories")
     
     categories = ["cold_outreach", "follow_up", "meeting_request", "revival"]
-    for category in categories:
-        config = OutreachConfig(
-            category=category,
-            sender_info={
-                "sender_name": "Mike Johnson",
-                "sender_title": "Business Development",
-                "sender_company": "GrowthCorp"
-            }
-        )
-        
+    base_config = OutreachConfig(
+        sender_info={
+            "sender_name": "Mike Johnson",
+            "sender_title": "Business Development",
+            "sender_company": "GrowthCorp"
+        }
+    )
+    configs = [base_config.copy(update={"category": category}) for category in categories]
+    messages = await asyncio.gather(*(
+        outreach_composer.compose_outreach(lead, config, precomputed_vars=lead_vars[lead.lead_id])
+        for config in configs
+    ), return_exceptions=True)
+    
+    for category, message in zip(categories, messages):
         try:
-            message = await outreach_composer.compose_outreach(lead, config)
+            if isinstance(message, Exception):
+                raise message
             print(f"✅ {category.upper()} - Template: {message.template_id}")
             print(f"   Subject: {message.subject}")
             print(f"   Response rate: {message.predicted_response_rate:.2f}")
@@ -116,29 +167,38 @@ async def test_outreach_composer():
         except Exception as e:
             print(f"❌ {category} error: {e}")
     
+    sys.stdout.flush()
+    
     # Test 4: Personalization depth
     print("\n🎯 Test 4: Testing personalization depth")
     
     depths = ["basic", "moderate", "deep"]
-    for depth in depths:
-        config = OutreachConfig(
-            category="cold_outreach",
-            personalization_depth=depth,
-            sender_info={
-                "sender_name": "Sarah Wilson",
-                "sender_title": "Sales Manager",
-                "sender_company": "PersonalizeIt"
-            }
-        )
-        
+    base_config = OutreachConfig(
+        category="cold_outreach",
+        sender_info={
+            "sender_name": "Sarah Wilson",
+            "sender_title": "Sales Manager",
+            "sender_company": "PersonalizeIt"
+        }
+    )
+    configs = [base_config.copy(update={"personalization_depth": depth}) for depth in depths]
+    messages = await asyncio.gather(*(
+        outreach_composer.compose_outreach(lead, config, precomputed_vars=lead_vars[lead.lead_id])
+        for config in configs
+    ), return_exceptions=True)
+    
+    for depth, message in zip(depths, messages):
         try:
-            message = await outreach_composer.compose_outreach(lead, config)
+            if isinstance(message, Exception):
+                raise message
             print(f"✅ {depth.upper()} depth - Personalization: {message.personalization_score:.2f}")
             print(f"   Variables used: {len(message.metadata.get('variables_used', []))}")
             
         except Exception as e:
             print(f"❌ {depth} depth error: {e}")
     
+    sys.stdout.flush()
+    
     # Test 5: A/B testing variants
     print("\n🔬 Test 5: A/B testing variants")
     
@@ -153,7 +213,9 @@ async def test_outreach_composer():
     )
     
     try:
-        message = await outreach_composer.compose_outreach(lead, config)
+        message = await compose_cached(
+            outreach_composer, lead, config, precomputed_vars=lead_vars[lead.lead_id]
+        )
         variants = message.metadata.get("ab_variants", [])
         print(f"✅ Generated {len(variants)} A/B variants")
         
@@ -164,21 +226,28 @@ async def test_outreach_composer():
     except Exception as e:
         print(f"❌ A/B testing error: {e}")
     
+    sys.stdout.flush()
+    
     # Test 6: Multiple industries
     print("\n🏭 Test 6: Testing different industries")
     
-    for lead in leads[:3]:
-        config = OutreachConfig(
-            category="cold_outreach",
-            sender_info={
-                "sender_name": "Lisa Rodriguez",
-                "sender_title": "Industry Specialist",
-                "sender_company": "IndustrySolutions"
-            }
-        )
-        
+    config = OutreachConfig(
+        category="cold_outreach",
+        sender_info={
+            "sender_name": "Lisa Rodriguez",
+            "sender_title": "Industry Specialist",
+            "sender_company": "IndustrySolutions"
+        }
+    )
+    messages = await asyncio.gather(*(
+        outreach_composer.compose_outreach(lead, config, precomputed_vars=lead_vars[lead.lead_id])
+        for lead in leads[:3]
+    ), return_exceptions=True)
+    
+    for lead, message in zip(leads[:3], messages):
         try:
-            message = await outreach_composer.compose_outreach(lead, config)
+            if isinstance(message, Exception):
+                raise message
             print(f"✅ {lead.company.industry} - {lead.contact.full_name}")
             print(f"   Template: {message.template_id}")
             print(f"   Personalization: {message.personalization_score:.2f}")
@@ -187,11 +256,13 @@ async def test_outreach_composer():
         except Exception as e:
             print(f"❌ {lead.company.industry} error: {e}")
     
+    sys.stdout.flush()
+    
     # Test 7: Template selection logic
     print("\n🎯 Test 7: Template selection logic")
     
     test_lead = leads[0]
-    composer = OutreachComposerAgent(mode="template")
+    composer = get_composer()
     
     # Test with different lead scores
     original_score = test_lead.score.total_score
@@ -208,21 +279,17 @@ async def test_outreach_composer():
     # Restore original score
     test_lead.score.total_score = original_score
     
+    sys.stdout.flush()
+    
     # Test 8: Quality scoring
     print("\n📊 Test 8: Quality scoring analysis")
     
-    config = OutreachConfig(
-        category="cold_outreach",
-        tone=ToneStyle.FORMAL,
-        sender_info={
-            "sender_name": "Quality Tester",
-            "sender_title": "Test Engineer",
-            "sender_company": "QualityCheck"
-        }
-    )
-    
     try:
-        message = await outreach_composer.compose_outreach(leads[0], config)
+        # Scores Test 1's message: same lead and config, so compose_cached
+        # answers from memory instead of composing again
+        message = await compose_cached(
+            outreach_composer, leads[0], basic_config, precomputed_vars=lead_vars[leads[0].lead_id]
+        )
         
         print(f"✅ Quality Analysis for {leads[0].contact.full_name}:")
         print(f"   Personalization Score: {message.personalization_score:.2f}")
@@ -235,8 +302,22 @@ async def test_outreach_composer():
     except Exception as e:
         print(f"❌ Quality scoring error: {e}")
     
+    sys.stdout.flush()
+    
     print("\n🎉 Outreach Composer Agent testing completed!")
 
 
+async def main():
+    """Run the tests, writing each phase's output as a single block"""
+    with buffered_stdout():
+        await test_outreach_composer()
+
+
 if __name__ == "__main__":
-    asyncio.run(test_outreach_composer())
\ No newline at end of file
+    # The gathered sweeps run on uvloop when it is installed
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(main())
\ No newline at end of file
@@ -3,49 +3,60 @@
 Simple test for Outreach Composer without dependencies
 """
 import asyncio
+import functools
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from outreach_composer_implementation import OutreachComposerAgent, OutreachConfig, ToneStyle
-from email_templates import EmailTemplateLibrary
 
-# Create mock classes for testing
+
+@functools.lru_cache(maxsize=None)
+def get_composer(mode: str = "template") -> OutreachComposerAgent:
+    """Return the shared composer for a mode, creating it on first use"""
+    return OutreachComposerAgent(mode=mode)
+
+
+# Create mock classes for testing. The data is fixed, so it lives on the
+# classes themselves and instances carry no per-instance state.
 class MockCompany:
-    def __init__(self):
-        self.name = "TestTech Inc"
-        self.industry = "SaaS"
-        self.employee_count = 150
-        self.location = "San Francisco, CA"
-        self.founded_year = 2018
-        self.recent_news = []
-        self.pain_points = ["customer churn", "scaling infrastructure"]
+    __slots__ = ()
+    name = "TestTech Inc"
+    industry = "SaaS"
+    employee_count = 150
+    location = "San Francisco, CA"
+    founded_year = 2018
+    recent_news = ()
+    pain_points = ("customer churn", "scaling infrastructure")
 
 class MockContact:
-    def __init__(self):
-        self.first_name = "John"
-        self.last_name = "Doe"
-        self.full_name = "John Doe"
-        self.title = "Chief Technology Officer"
-        self.department = "Engineering"
-        self.seniority = "C-Level"
-        self.email = "john.doe@testtech.com"
+    __slots__ = ()
+    first_name = "John"
+    last_name = "Doe"
+    full_name = "John Doe"
+    title = "Chief Technology Officer"
+    department = "Engineering"
+    seniority = "C-Level"
+    email = "john.doe@testtech.com"
 
 class MockScore:
-    def __init__(self):
-        self.total_score = 85
-        self.industry_match = 30
-        self.title_relevance = 25
-        self.company_size_fit = 20
-        self.recent_activity = 10
+    __slots__ = ()
+    total_score = 85
+    industry_match = 30
+    title_relevance = 25
+    company_size_fit = 20
+    recent_activity = 10
 
 class MockLead:
-    def __init__(self):
-        self.lead_id = "lead_test_123"
-        self.contact = MockContact()
-        self.company = MockCompany()
-        self.score = MockScore()
-        self.outreach_priority = "high"
+    __slots__ = ()
+    lead_id = "lead_test_123"
+    contact = MockContact()
+    company = MockCompany()
+    score = MockScore()
+    outreach_priority = "high"
+
+# Shared by every test below; nothing writes to it
+MOCK_LEAD = MockLead()
 
 
 async def test_outreach_simple():
@@ -56,7 +67,8 @@ async def test_outreach_simple():
     
     # Test 1: Template Library
     print("\n📚 Test 1: Template Library")
-    library = EmailTemplateLibrary()
+    # The composer's template library is loaded once per process
+    library = get_composer().template_library
     
     print(f"✅ Loaded {len(library.templates)} templates")
     
@@ -72,8 +84,8 @@ async def test_outreach_simple():
     # Test 2: Basic Composition
     print("\n📝 Test 2: Basic Composition")
     
-    composer = OutreachComposerAgent(mode="template")
-    lead = MockLead()
+    composer = get_composer()
+    lead = MOCK_LEAD
     
     config = OutreachConfig(
         category="cold_outreach",
@@ -212,4 +224,10 @@ async def test_outreach_simple():
 
 
 if __name__ == "__main__":
+    # Use uvloop for the event loop if available
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(test_outreach_simple())
\ No newline at end of file
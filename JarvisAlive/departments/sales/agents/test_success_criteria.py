@@ -10,6 +10,7 @@ import json
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
 from lead_scanner_implementation import LeadScannerAgent, ScanCriteria
+from buffered_output import gather_buffered
 
 async def test_ai_mode_enrichment():
     """✅ AI mode enriches leads with additional insights"""
@@ -414,6 +415,17 @@ async def test_execution_time():
     print(f"\n✅ PASS: Execution under {target_time}s" if result else f"\n❌ FAIL: Execution took {execution_time:.1f}s")
     return result
 
+async def run_concurrently(tests):
+    """Run tests together, then print their output in order; return their results"""
+    results = []
+    for output, result in await gather_buffered(tests):
+        print(output, end="")
+        if isinstance(result, Exception):
+            raise result
+        results.append(result)
+    return results
+
+
 async def main():
     """Run all success criteria tests"""
     print("🎯 AI-Enhanced Lead Scanner: Success Criteria Validation")
@@ -423,15 +435,34 @@ async def main():
     results = {}
     
     try:
-        # Run all success criteria tests
-        results['ai_mode_enrichment'] = await test_ai_mode_enrichment()
-        results['hybrid_selective'] = await test_hybrid_mode_selective_enrichment()
-        results['meaningful_pain_points'] = await test_meaningful_pain_points()
-        results['cost_efficiency'] = await test_cost_efficiency()
-        results['graceful_fallback'] = await test_graceful_fallback()
-        results['enrichment_source'] = await test_enrichment_source_field()
-        results['caching_prevention'] = await test_caching_prevention()
-        results['execution_time'] = await test_execution_time()
+        # Each test builds its own agent, so the independent ones run together
+        concurrent_tests = {
+            'ai_mode_enrichment': test_ai_mode_enrichment,
+            'hybrid_selective': test_hybrid_mode_selective_enrichment,
+            'meaningful_pain_points': test_meaningful_pain_points,
+            'cost_efficiency': test_cost_efficiency,
+            'enrichment_source': test_enrichment_source_field,
+            'execution_time': test_execution_time
+        }
+        concurrent_results = dict(zip(
+            concurrent_tests, await run_concurrently(concurrent_tests.values())
+        ))
+        
+        # These change the AI engine's failure rate and cache, so run them alone
+        graceful_fallback = await test_graceful_fallback()
+        caching_prevention = await test_caching_prevention()
+        
+        # Report in the original criteria order
+        results = {
+            'ai_mode_enrichment': concurrent_results['ai_mode_enrichment'],
+            'hybrid_selective': concurrent_results['hybrid_selective'],
+            'meaningful_pain_points': concurrent_results['meaningful_pain_points'],
+            'cost_efficiency': concurrent_results['cost_efficiency'],
+            'graceful_fallback': graceful_fallback,
+            'enrichment_source': concurrent_results['enrichment_source'],
+            'caching_prevention': caching_prevention,
+            'execution_time': concurrent_results['execution_time']
+        }
         
         # Summary
         print("\n" + "=" * 70)
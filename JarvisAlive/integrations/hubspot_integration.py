@@ -8,10 +8,14 @@ import os
 import json
 import asyncio
 import logging
+import time
+import weakref
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Deque, Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
+import functools
 import hashlib
 
 from hubspot import HubSpot
@@ -21,10 +25,25 @@ from hubspot.crm.deals import ApiException as DealsApiException
 import redis.asyncio as redis
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
+# orjson encodes and parses cached API results faster; fall back to the stdlib
+# if absent. Values that neither encoder handles natively are cached as str.
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = functools.partial(orjson.dumps, default=str)
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = functools.partial(json.dumps, default=str, separators=(",", ":"))
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# HubSpot burst limit: at most this many requests in any sliding window, so
+# callers wait locally instead of tripping 429s and retrying
+_RATE_LIMIT_REQUESTS = 9
+_RATE_LIMIT_WINDOW_SECONDS = 5.0
+
 
 class SearchOperator(Enum):
     """HubSpot search operators"""
@@ -119,51 +138,81 @@ class HubSpotIntegration:
     - Pagination handling
     """
     
-    def __init__(self, access_token: Optional[str] = None, redis_client: Optional[redis.Redis] = None):
+    # API clients by access token, shared so every integration using a token
+    # reuses the same HTTP connection pools instead of opening new ones
+    _api_clients: Dict[str, HubSpot] = {}
+    
+    # Rate-limit lock and request window per event loop and access token.
+    # HubSpot counts requests per token, so every integration using one shares
+    # the budget; a lock only works on its own loop, and a loop's windows are
+    # dropped with it.
+    _rate_windows: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = weakref.WeakKeyDictionary()
+    
+    def __init__(
+        self,
+        access_token: Optional[str] = None,
+        redis_client: Optional[redis.Redis] = None,
+        api_client: Optional[HubSpot] = None
+    ):
         """
         Initialize HubSpot integration
         
         Args:
             access_token: HubSpot API access token
             redis_client: Redis client for caching
+            api_client: HubSpot API client to use instead of the shared one for the token
         """
         self.access_token = access_token or os.getenv("HUBSPOT_ACCESS_TOKEN")
-        self.api_client = None
+        self.api_client = api_client
         self.redis_client = redis_client
         
-        # Rate limiting
-        self.rate_limiter = asyncio.Semaphore(10)  # 10 requests per second
-        self.last_request_time = datetime.utcnow()
-        
         # Cache settings
         self.cache_ttl = 3600  # 1 hour
         self.cache_prefix = "hubspot:"
         
-        if self.access_token:
+        if self.access_token and self.api_client is None:
             self._initialize_client()
     
     def _initialize_client(self):
-        """Initialize HubSpot API client"""
+        """Initialize HubSpot API client, reusing the shared one for the token"""
         try:
-            self.api_client = HubSpot(access_token=self.access_token)
-            logger.info("HubSpot API client initialized")
+            api_client = self._api_clients.get(self.access_token)
+            if api_client is None:
+                api_client = self._api_clients[self.access_token] = HubSpot(access_token=self.access_token)
+                logger.info("HubSpot API client initialized")
+            self.api_client = api_client
         except Exception as e:
             logger.error(f"Failed to initialize HubSpot client: {e}")
             raise
     
+    def _rate_window(self) -> Tuple[asyncio.Lock, Deque[float]]:
+        """Return the shared lock and monotonic send times for this loop and token"""
+        loop_windows = self._rate_windows.setdefault(asyncio.get_running_loop(), {})
+        window = loop_windows.get(self.access_token)
+        if window is None:
+            window = loop_windows[self.access_token] = (asyncio.Lock(), deque())
+        return window
+    
     def update_access_token(self, access_token: str):
         """Update access token and reinitialize client"""
         self.access_token = access_token
         self._initialize_client()
     
     async def _rate_limit(self):
-        """Enforce rate limiting"""
-        async with self.rate_limiter:
-            # Ensure minimum 100ms between requests
-            elapsed = (datetime.utcnow() - self.last_request_time).total_seconds()
-            if elapsed < 0.1:
-                await asyncio.sleep(0.1 - elapsed)
-            self.last_request_time = datetime.utcnow()
+        """Wait for a free slot in the sliding request window"""
+        lock, window = self._rate_window()
+        async with lock:
+            now = time.monotonic()
+            while window and now - window[0] >= _RATE_LIMIT_WINDOW_SECONDS:
+                window.popleft()
+            
+            if len(window) >= _RATE_LIMIT_REQUESTS:
+                # Waiters queue on the lock, so slots are handed out in order
+                await asyncio.sleep(_RATE_LIMIT_WINDOW_SECONDS - (now - window[0]))
+                window.popleft()
+                now = time.monotonic()
+            
+            window.append(now)
     
     def _cache_key(self, prefix: str, params: Dict[str, Any]) -> str:
         """Generate cache key from parameters"""
@@ -180,7 +229,7 @@ class HubSpotIntegration:
         try:
             data = await self.redis_client.get(key)
             if data:
-                return json.loads(data)
+                return _json_loads(data)
         except Exception as e:
             logger.warning(f"Cache get error: {e}")
         
@@ -195,7 +244,7 @@ class HubSpotIntegration:
             await self.redis_client.setex(
                 key,
                 ttl or self.cache_ttl,
-                json.dumps(data, default=str)
+                _json_dumps(data)
             )
         except Exception as e:
             logger.warning(f"Cache set error: {e}")
@@ -768,6 +817,38 @@ class HubSpotIntegration:
         Returns:
             List of matching contacts
         """
+        filter_groups = self.build_contact_filter_groups(
+            title_keywords=title_keywords,
+            industries=industries,
+            company_size_min=company_size_min,
+            company_size_max=company_size_max,
+            last_activity_days=last_activity_days,
+            min_email_opens=min_email_opens,
+            lifecycle_stages=lifecycle_stages,
+            custom_filters=custom_filters
+        )
+        return await self.search_contacts_by_filter_groups(filter_groups, limit=limit)
+    
+    def build_contact_filter_groups(
+        self,
+        title_keywords: Optional[List[str]] = None,
+        industries: Optional[List[str]] = None,
+        company_size_min: Optional[int] = None,
+        company_size_max: Optional[int] = None,
+        last_activity_days: Optional[int] = None,
+        min_email_opens: Optional[int] = None,
+        lifecycle_stages: Optional[List[str]] = None,
+        custom_filters: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Build the search filter groups for search_contacts_by_criteria
+        
+        Groups are ORed by HubSpot, so the groups of several criteria can be
+        combined into one search that covers all of them.
+        
+        Returns:
+            List of filter groups
+        """
         # Build filter groups
         filter_groups = []
         
@@ -814,7 +895,11 @@ class HubSpotIntegration:
         
         # Last activity filter
         if last_activity_days:
-            cutoff_date = datetime.utcnow() - timedelta(days=last_activity_days)
+            # Whole days, so the same criteria always build the same filter
+            # (and hit the same search cache key)
+            cutoff_date = (datetime.utcnow() - timedelta(days=last_activity_days)).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
             filter_groups.append({
                 "filters": [{
                     "propertyName": "notes_last_contacted",
@@ -847,6 +932,23 @@ class HubSpotIntegration:
         if custom_filters:
             filter_groups.extend(custom_filters)
         
+        return filter_groups
+    
+    async def search_contacts_by_filter_groups(
+        self,
+        filter_groups: List[Dict[str, Any]],
+        limit: int = 100
+    ) -> List[HubSpotContact]:
+        """
+        Search contacts matching any of the filter groups, most engaged first
+        
+        Args:
+            filter_groups: Filter groups, e.g. from build_contact_filter_groups
+            limit: Maximum results
+        
+        Returns:
+            List of matching contacts
+        """
         # Sort by engagement
         sorts = [{
             "propertyName": "hs_analytics_num_page_views",
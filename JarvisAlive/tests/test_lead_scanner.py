@@ -4,12 +4,8 @@ from datetime import datetime, timedelta
 from typing import List
 import time
 from unittest.mock import Mock, patch, AsyncMock
-import sys
-import os
-
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# conftest.py puts the project root on sys.path
 from departments.sales.agents.lead_scanner_implementation import (
     LeadScannerAgent, ScanCriteria, LeadScore, Lead
 )
@@ -364,6 +360,145 @@ class TestLeadScanner:
         assert scanner.scoring_weights['industry_match'] == 40
         assert scanner.scoring_weights['title_relevance'] == 30
 
+    @pytest.mark.asyncio
+    async def test_hubspot_init_reuses_injected_redis_client(self):
+        """Test HubSpot setup uses a shared Redis client instead of opening its own"""
+        shared_redis = Mock()
+        scanner = LeadScannerAgent(mode="mock", redis_client=shared_redis)
+        module = "departments.sales.agents.lead_scanner_implementation"
+
+        with patch(f"{module}.redis.from_url") as from_url, \
+                patch(f"{module}.SupabaseAuthManager", side_effect=RuntimeError("no Supabase")):
+            await scanner._initialize_hubspot()
+
+        from_url.assert_not_called()
+        assert scanner.redis_client is shared_redis
+
+    @pytest.mark.asyncio
+    async def test_ready_waits_for_hubspot_init(self):
+        """Test ready() returns once background HubSpot setup has settled"""
+        module = "departments.sales.agents.lead_scanner_implementation"
+
+        with patch(f"{module}.SupabaseAuthManager", side_effect=RuntimeError("no Supabase")):
+            scanner = LeadScannerAgent(mode="hubspot", redis_client=Mock())
+            await scanner.ready()
+
+        assert scanner._init_task.done()
+        assert scanner.mode == "mock"  # Failed setup falls back to mock data
+
+    @pytest.mark.asyncio
+    async def test_scan_for_leads_batch_shares_identical_hubspot_searches(self):
+        """Test batched HubSpot scans run one search per distinct set of filter groups"""
+        from integrations.hubspot_integration import HubSpotIntegration
+
+        scanner = LeadScannerAgent(mode="mock")
+        scanner.mode = "hubspot"
+        scanner.hubspot_client = HubSpotIntegration(api_client=Mock())
+        contacts = [Mock(name=f"contact_{i}") for i in range(20)]
+        search = scanner.hubspot_client.search_contacts_by_filter_groups = AsyncMock(return_value=contacts)
+        full = dict(industries=["SaaS"], company_sizes=["51-200"])
+        criteria_list = [
+            ScanCriteria(titles=["CTO"], max_results=5, **full),
+            ScanCriteria(titles=["CTO"], max_results=10, min_score=80, **full),  # Same search as the first
+            ScanCriteria(titles=["VP"], max_results=3, **full)
+        ]
+
+        with patch.object(scanner, "_build_hubspot_leads", AsyncMock(side_effect=lambda found, c: found)):
+            results = await scanner.scan_for_leads_batch(criteria_list)
+
+        assert search.await_count == 2
+        for call in search.await_args_list:
+            assert len(call.args[0]) == 5  # Title, industry, size, activity and lifecycle
+        assert sorted(call.kwargs["limit"] for call in search.await_args_list) == [6, 20]
+        assert [len(found) for found in results] == [10, 20, 6]
+        assert results[0] == contacts[:10]
+
+    def test_hubspot_filter_groups_are_stable(self):
+        """Test the same criteria always build the same filter groups"""
+        from integrations.hubspot_integration import HubSpotIntegration
+
+        scanner = LeadScannerAgent(mode="mock")
+        hubspot = HubSpotIntegration(api_client=Mock())
+        criteria = ScanCriteria(titles=["CTO"], industries=["SaaS"])
+
+        first = hubspot.build_contact_filter_groups(**scanner._hubspot_search_filters(criteria))
+        time.sleep(0.001)
+        second = hubspot.build_contact_filter_groups(**scanner._hubspot_search_filters(criteria))
+
+        assert first == second
+
+    @pytest.mark.asyncio
+    async def test_aclose_closes_the_engine_but_not_a_shared_redis(self):
+        """Test aclose() releases the agent's AI engine and leaves a passed-in Redis client open"""
+        shared_redis = Mock(aclose=AsyncMock())
+        agent = LeadScannerAgent(mode="hybrid", config={"ai_provider": "mock"}, redis_client=shared_redis)
+        agent.ai_engine = Mock(aclose=AsyncMock())
+
+        await agent.aclose()
+
+        agent.ai_engine.aclose.assert_awaited_once()
+        shared_redis.aclose.assert_not_awaited()
+
+    def test_hubspot_rate_window_is_shared_per_token_and_loop(self):
+        """Test one token shares a rate-limit window within a loop and starts fresh on a new one"""
+        from integrations.hubspot_integration import HubSpotIntegration
+
+        first = HubSpotIntegration(access_token="token-a", api_client=Mock())
+        second = HubSpotIntegration(access_token="token-a", api_client=Mock())
+        other = HubSpotIntegration(access_token="token-b", api_client=Mock())
+
+        async def burst():
+            await asyncio.gather(first._rate_limit(), second._rate_limit(), other._rate_limit())
+            return first._rate_window(), second._rate_window(), other._rate_window()
+
+        (lock_a, times_a), (lock_b, _), (lock_other, times_other) = asyncio.run(burst())
+        assert lock_a is lock_b
+        assert len(times_a) == 2 and len(times_other) == 1
+        assert lock_other is not lock_a
+
+        # A second run gets its own lock and an empty window instead of failing
+        # on a lock bound to the first loop
+        (next_lock, next_times), _, _ = asyncio.run(burst())
+        assert next_lock is not lock_a
+        assert len(next_times) == 2
+
+    @pytest.mark.asyncio
+    async def test_scan_for_leads_many_scans_only_cache_misses(self, scanner):
+        """Test cached scan results come from one MGET and only misses are scanned"""
+        cached_criteria = ScanCriteria(industries=["SaaS"], min_score=0, max_results=3)
+        missed_criteria = ScanCriteria(industries=["FinTech"], min_score=0, max_results=3)
+        cached_leads = await scanner.scan_for_leads(cached_criteria)
+        cached_json = "[" + ",".join(lead.json() for lead in cached_leads) + "]"
+
+        pipe = Mock(execute=AsyncMock())
+        scanner.redis_client = Mock(mget=AsyncMock(return_value=[cached_json, None]))
+        scanner.redis_client.pipeline.return_value = pipe
+
+        with patch.object(scanner, "scan_for_leads_batch", wraps=scanner.scan_for_leads_batch) as batch:
+            cached, missed = await scanner.scan_for_leads_many([cached_criteria, missed_criteria])
+
+        scanner.redis_client.mget.assert_awaited_once()
+        batch.assert_awaited_once_with([missed_criteria])
+        assert [lead.lead_id for lead in cached] == [lead.lead_id for lead in cached_leads]
+        assert all(lead.company.industry == "FinTech" for lead in missed)
+        pipe.set.assert_called_once()
+        assert pipe.set.call_args.args[0] == scanner._scan_cache_key(missed_criteria)
+        pipe.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_scan_cache_round_trips_leads(self, scanner):
+        """Test leads written to the scan cache read back unchanged"""
+        criteria = ScanCriteria(min_score=0, max_results=3)
+        pipe = Mock(execute=AsyncMock())
+        scanner.redis_client = Mock(mget=AsyncMock(return_value=[None]))
+        scanner.redis_client.pipeline.return_value = pipe
+
+        [leads] = await scanner.scan_for_leads_many([criteria])
+        scanner.redis_client.mget.return_value = [pipe.set.call_args.args[1]]
+        [cached] = await scanner.scan_for_leads_many([criteria])
+
+        assert cached == leads
+
     # ========== Priority and Confidence Tests ==========
     
     def test_priority_assignment(self, scanner):
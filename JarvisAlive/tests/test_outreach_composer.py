@@ -0,0 +1,515 @@
+import pytest
+import asyncio
+from datetime import datetime, timedelta, timezone
+import sys
+import os
+from unittest.mock import Mock, AsyncMock, patch
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from departments.sales.agents.outreach_composer_implementation import (
+    OutreachComposerAgent, OutreachConfig, OutreachMessage
+)
+from departments.sales.agents.lead_scanner_implementation import LeadScore, Lead
+from departments.sales.agents.email_templates import ToneStyle
+from database.mock_data import Company, Contact, CompanyNews
+
+
+class TestOutreachComposer:
+    @pytest.fixture
+    def composer(self):
+        """Create template-mode composer for testing"""
+        return OutreachComposerAgent(mode="template")
+
+    @pytest.fixture
+    def sample_lead(self):
+        """Create a sample lead for testing"""
+        company = Company(
+            id="comp_test123",
+            name="TestTech Inc",
+            website="https://testtech.com",
+            industry="SaaS",
+            sub_industry="HR Tech",
+            employee_count=150,
+            employee_range="51-200",
+            location="San Francisco, CA",
+            headquarters="San Francisco, CA",
+            founded_year=2018,
+            description="Test company for unit testing",
+            recent_news=[
+                CompanyNews(
+                    date=datetime.now() - timedelta(days=15),
+                    title="TestTech raises Series A",
+                    summary="Raised $10M in Series A funding",
+                    news_type="funding"
+                )
+            ],
+            pain_points=["customer churn", "Customer retention"],
+            technologies=["Python", "React", "AWS"],
+            funding_stage="Series A",
+            revenue_range="$1M-$10M",
+            growth_rate="50-100%"
+        )
+        contact = Contact(
+            id="cont_test456",
+            first_name="John",
+            last_name="Doe",
+            full_name="John Doe",
+            title="VP of Sales",
+            department="Sales",
+            seniority="VP",
+            company_id="comp_test123",
+            company_name="TestTech Inc",
+            email="john.doe@testtech.com",
+            linkedin_url="https://linkedin.com/in/johndoe",
+            phone="+1-555-0123",
+            location="San Francisco, CA",
+            years_in_role=2,
+            pain_points=["Pipeline visibility"],
+            priorities=["Revenue growth"],
+            reports_to=None
+        )
+        score = LeadScore(
+            total_score=72,
+            industry_match=30,
+            title_relevance=20,
+            company_size_fit=12,
+            recent_activity=10,
+            explanation="Test lead",
+            confidence=0.8
+        )
+        return Lead(
+            lead_id="lead_test789",
+            contact=contact,
+            company=company,
+            score=score,
+            discovered_at=datetime.now(),
+            source="mock_database",
+            outreach_priority="medium"
+        )
+
+    @pytest.fixture
+    def sample_config(self):
+        """Standard outreach config"""
+        return OutreachConfig(
+            tone=ToneStyle.FORMAL,
+            sender_info={"sender_name": "Jane Smith", "sender_company": "SalesCo"}
+        )
+
+    # ========== Composition ==========
+
+    def test_compose_outreach_sync_template_mode(self, composer, sample_lead, sample_config):
+        """Test sync composition returns a filled template message"""
+        message = composer.compose_outreach_sync(sample_lead, sample_config)
+
+        assert isinstance(message, OutreachMessage)
+        assert message.generation_mode == "template"
+        assert message.lead_id == sample_lead.lead_id
+        assert "{{" not in message.body
+        assert "John" in message.body
+
+    @pytest.mark.asyncio
+    async def test_compose_outreach_sync_matches_async(self, composer, sample_lead, sample_config):
+        """Test sync and async template paths pick the same template"""
+        sync_message = composer.compose_outreach_sync(sample_lead, sample_config)
+        async_message = await composer.compose_outreach(sample_lead, sample_config)
+
+        assert sync_message.template_id == async_message.template_id
+
+    @pytest.mark.asyncio
+    async def test_compose_batch(self, composer, sample_lead, sample_config):
+        """Test batch composition keeps order and shares one timestamp"""
+        other_lead = sample_lead.copy(update={"lead_id": "lead_other"})
+
+        messages = await composer.compose_batch([sample_lead, other_lead], sample_config)
+
+        assert [m.lead_id for m in messages] == ["lead_test789", "lead_other"]
+        assert messages[0].created_at == messages[1].created_at
+
+    def test_compose_outreach_sync_rejects_ai_modes(self, sample_lead, sample_config):
+        """Test sync composition is template-only"""
+        composer = OutreachComposerAgent(mode="hybrid", config={"ai_provider": "mock"})
+
+        with pytest.raises(ValueError):
+            composer.compose_outreach_sync(sample_lead, sample_config)
+
+    def test_fill_template_variables(self, composer):
+        """Test placeholders are filled in one pass and unknown ones are kept"""
+        filled = composer._fill_template_variables(
+            "Hi {{first_name}}, {{company}} and {{unknown}} - {{first_name}}",
+            {"first_name": "John", "company": "TestTech Inc", "unused": "x"}
+        )
+
+        assert filled == "Hi John, TestTech Inc and {{unknown}} - John"
+
+    def test_library_templates_are_precompiled(self, composer):
+        """Test every body and subject line is split once at load, not per compose"""
+        library = composer.template_library
+        for template in library.templates.values():
+            for text in [template.body_template, *template.subject_lines]:
+                assert library.get_compiled(text) is library.compiled[text]
+
+    def test_personalization_variables_cached_per_lead(self, composer, sample_lead):
+        """Test variables are reused per lead until the cache is cleared"""
+        first = composer._extract_personalization_variables(sample_lead)
+        first["company"] = "Mutated"
+        second = composer._extract_personalization_variables(sample_lead)
+
+        assert second["company"] == "TestTech Inc"
+        assert sample_lead.lead_id in composer._var_cache
+
+        composer.clear_lead_cache(sample_lead.lead_id)
+
+        assert sample_lead.lead_id not in composer._var_cache
+
+    @pytest.mark.asyncio
+    async def test_compose_outreach_uses_precomputed_vars(self, composer, sample_lead, sample_config):
+        """Test precomputed personalization variables skip extraction and are not modified"""
+        precomputed = composer._extract_personalization_variables(sample_lead)
+        snapshot = dict(precomputed)
+        composer._extract_personalization_variables = Mock(side_effect=AssertionError("re-extracted"))
+
+        message = await composer.compose_outreach(sample_lead, sample_config, precomputed_vars=precomputed)
+
+        assert "John" in message.body
+        assert precomputed == snapshot
+
+    @pytest.mark.asyncio
+    async def test_compose_outreach_uses_shared_timestamp(self, composer, sample_lead, sample_config):
+        """Test batch callers can stamp messages with one timestamp"""
+        now = datetime(2024, 1, 15, 9, 30)
+
+        message = await composer.compose_outreach(sample_lead, sample_config, now=now)
+
+        assert message.created_at == now
+
+    @pytest.mark.asyncio
+    async def test_create_runs_async_setup(self):
+        """Test the async factory returns a ready agent without Gmail"""
+        composer = await OutreachComposerAgent.create(mode="template")
+
+        assert composer.mode == "template"
+        assert composer.gmail_client is None
+
+    def test_agents_share_template_library(self, composer):
+        """Test the template library is loaded once per process"""
+        other = OutreachComposerAgent(mode="template")
+
+        assert other.template_library is composer.template_library
+
+    @pytest.mark.asyncio
+    async def test_injected_ai_engine_is_shared_and_not_closed(self):
+        """Test agents reuse an injected AI engine and leave closing it to the caller"""
+        engine = Mock(aclose=AsyncMock())
+        composers = [
+            OutreachComposerAgent(mode=mode, config={"ai_provider": "mock"}, ai_engine=engine)
+            for mode in ("ai", "hybrid")
+        ]
+
+        assert all(composer.ai_engine is engine for composer in composers)
+        for composer in composers:
+            await composer.aclose()
+        engine.aclose.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_cached_ai_engine_is_not_closed(self):
+        """Test aclose() leaves engines from the process-wide cache open for other agents"""
+        module = "departments.sales.agents.outreach_composer_implementation"
+        engine = Mock(aclose=AsyncMock())
+        config = {"ai_provider": "anthropic", "api_key": "key"}
+        with patch(f"{module}.AnthropicEngine", return_value=engine), patch.dict(f"{module}._AI_ENGINE_CACHE", clear=True):
+            first = OutreachComposerAgent(mode="ai", config=config)
+            second = OutreachComposerAgent(mode="ai", config=config)
+
+        assert first.ai_engine is second.ai_engine is engine
+        await first.aclose()
+        engine.aclose.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_close_cached_engines_closes_and_clears_the_cache(self):
+        """Test shutdown closes every shared engine once and empties the cache"""
+        module = "departments.sales.agents.outreach_composer_implementation"
+        engine = Mock(aclose=AsyncMock())
+        with patch.dict(f"{module}._AI_ENGINE_CACHE", {("anthropic", "model", "key"): engine}, clear=True):
+            from departments.sales.agents.outreach_composer_implementation import (
+                _AI_ENGINE_CACHE, close_cached_engines
+            )
+            await close_cached_engines()
+            assert not _AI_ENGINE_CACHE
+
+        engine.aclose.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_aclose_leaves_a_shared_redis_client_open(self, composer):
+        """Test aclose() only closes a Redis client the agent opened itself"""
+        shared_redis = Mock(aclose=AsyncMock())
+        composer.redis_client = shared_redis
+
+        await composer.aclose()
+
+        shared_redis.aclose.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_ai_variations_come_from_one_call(self, sample_lead, sample_config):
+        """Test both alternative variants are parsed from a single AI response"""
+        composer = OutreachComposerAgent(mode="ai", config={"ai_provider": "mock"})
+        composer.ai_engine.generate = AsyncMock(return_value=Mock(content=(
+            "VARIATION 1:\nSUBJECT: ROI for TestTech\nBODY: Hi John, on ROI...\n"
+            "VARIATION 2:\nSUBJECT: Stay ahead\nBODY: Hi John, on innovation...\n"
+        )))
+
+        variations = await composer._generate_ai_variations(sample_lead, "Base", "Hi John", sample_config)
+
+        assert [v["variant"] for v in variations] == ["A", "B", "C"]
+        assert variations[1]["subject"] == "ROI for TestTech"
+        assert composer.ai_engine.generate.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_ai_mode_composes_from_ai_reply(self, sample_lead, sample_config):
+        """Test AI mode uses the engine's email and scores it alongside the variations"""
+        composer = OutreachComposerAgent(mode="ai", config={"ai_provider": "mock"})
+        composer.ai_engine.generate = AsyncMock(return_value=Mock(
+            content="SUBJECT: Congrats on the Series A\nBODY: Hi John,\nCongrats on the raise.",
+            usage={"total_tokens": 120}
+        ))
+        composer._generate_ai_variations = AsyncMock(return_value=[{}, {}, {}])
+        composer._predict_response_rate_ai = AsyncMock(return_value=0.4)
+        composer._quality_check_ai_message = AsyncMock(return_value={"passed": True, "issues": []})
+
+        message = await composer.compose_outreach(sample_lead, sample_config)
+
+        assert message.generation_mode == "ai"
+        assert message.subject == "Congrats on the Series A"
+        assert message.body == "Hi John,\nCongrats on the raise."
+        assert message.predicted_response_rate == 0.4
+        assert message.metadata["variations_generated"] == 3
+        composer._predict_response_rate_ai.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_ai_compose_prompts_share_the_sender_prefix(self, sample_lead, sample_config):
+        """Test the sender and style head is rendered once and leads only differ after it"""
+        composer = OutreachComposerAgent(mode="ai", config={"ai_provider": "mock"})
+        composer.ai_engine.generate = AsyncMock(return_value=Mock(content="no email", usage={}))
+        other_lead = sample_lead.copy(update={"lead_id": "lead_other"})
+        other_lead.contact = sample_lead.contact.copy(update={"full_name": "Ann Lee"})
+
+        await composer.compose_outreach(sample_lead, sample_config)
+        await composer.compose_outreach(other_lead, sample_config)
+
+        prefix = composer._compose_prompt_prefix(sample_config)
+        prompts = [call.args[0] for call in composer.ai_engine.generate.await_args_list]
+        assert len(composer._prompt_prefix_cache) == 1
+        assert all(prompt.startswith(prefix) for prompt in prompts)
+        assert prompts[0] != prompts[1]
+
+    @pytest.mark.asyncio
+    async def test_ai_mode_falls_back_on_unparseable_reply(self, sample_lead, sample_config):
+        """Test a reply without an email body yields an enhanced template message"""
+        composer = OutreachComposerAgent(mode="ai", config={"ai_provider": "mock"})
+        composer.ai_engine.generate = AsyncMock(return_value=Mock(content="Here are some thoughts.", usage={}))
+
+        message = await composer.compose_outreach(sample_lead, sample_config)
+
+        assert message.generation_mode == "ai"
+        assert message.template_id is not None
+        assert message.metadata["ai_enhanced"] is True
+
+    # ========== Sending ==========
+
+    @pytest.mark.asyncio
+    async def test_send_real_email_batch_without_gmail(self, composer, sample_lead, sample_config):
+        """Test batch send returns one result per pair when Gmail is disabled"""
+        message = composer.compose_outreach_sync(sample_lead, sample_config)
+
+        results = await composer.send_real_email_batch([(message, sample_lead)] * 3, max_concurrency=2)
+
+        assert len(results) == 3
+        assert all(r["fallback"] == "email_sending_disabled" for r in results)
+
+    def test_unsubscribe_url_accepts_long_secrets(self, sample_lead):
+        """Test secrets longer than BLAKE2b's 64-byte key limit still produce keyed tokens"""
+        composers = [
+            OutreachComposerAgent(mode="template", config={"unsubscribe_secret": secret})
+            for secret in ("s" * 100, "t" * 100)
+        ]
+
+        urls = [c._generate_unsubscribe_url(sample_lead, "msg_1") for c in composers]
+
+        assert urls[0] != urls[1]
+        assert urls[0] == composers[0]._generate_unsubscribe_url(sample_lead, "msg_1")
+
+    def test_unsubscribe_secret_is_required_for_gmail(self):
+        """Test agents that send email refuse to start without an unsubscribe secret"""
+        with patch.dict(os.environ, {}, clear=True):
+            with pytest.raises(ValueError):
+                OutreachComposerAgent(mode="template", config={"gmail_enabled": True})
+
+    def test_unsubscribe_tokens_without_secret_are_still_keyed(self, sample_lead):
+        """Test agents without a secret share a random process key instead of an empty one"""
+        import hashlib
+
+        with patch.dict(os.environ, {}, clear=True):
+            composers = [OutreachComposerAgent(mode="template") for _ in range(2)]
+
+        urls = [c._generate_unsubscribe_url(sample_lead, "msg_1") for c in composers]
+        token_data = f"{sample_lead.lead_id}:msg_1:{sample_lead.contact.email}"
+        unkeyed = hashlib.blake2b(token_data.encode(), digest_size=8).hexdigest()
+
+        assert urls[0] == urls[1]
+        assert not urls[0].endswith(unkeyed)
+
+    @pytest.mark.asyncio
+    async def test_update_lead_tracking_batch_uses_one_pipeline(self, composer, sample_lead, sample_config):
+        """Test tracking writes for several emails go out in one round-trip"""
+        message = composer.compose_outreach_sync(sample_lead, sample_config)
+        pipe = Mock(execute=AsyncMock(return_value=[]))
+        history_script, tracking_script = AsyncMock(), AsyncMock()
+        composer.redis_client = Mock(
+            pipeline=Mock(return_value=pipe),
+            register_script=Mock(side_effect=[history_script, tracking_script])
+        )
+
+        sent = datetime(2024, 1, 2, 3, 4, 5)
+        await composer._update_lead_tracking_batch([(sample_lead, message, {"gmail_id": "g1"}, sent)] * 2)
+
+        composer.redis_client.pipeline.assert_called_once_with(transaction=False)
+        pipe.execute.assert_awaited_once()
+        pipe.setex.assert_not_called()
+        assert history_script.await_count == 2
+        assert history_script.await_args.kwargs["client"] is pipe
+        tracking_script.assert_awaited_once()
+        assert tracking_script.await_args.kwargs["keys"] == [f"outreach_tracking:{message.message_id}"] * 2
+        assert len(tracking_script.await_args.kwargs["args"]) == 3
+        history_args = history_script.await_args.kwargs["args"]
+        assert history_args[1] == sent.timestamp()
+        # The offset turns a naive sent_at read as UTC back into its timestamp
+        assert sent.replace(tzinfo=timezone.utc).timestamp() - history_args[4] == sent.timestamp()
+
+    @pytest.mark.asyncio
+    async def test_tracking_is_flushed_in_background(self, composer, sample_lead, sample_config):
+        """Test queued tracking writes are batched by the worker and drained on stop"""
+        message = composer.compose_outreach_sync(sample_lead, sample_config)
+        composer.redis_client = Mock()
+        composer._update_lead_tracking_batch = AsyncMock()
+        await composer.start()
+
+        before = datetime.now()
+        await composer._enqueue_lead_tracking(sample_lead, message, {"gmail_id": "g1"})
+        await composer._enqueue_lead_tracking(sample_lead, message, {"gmail_id": "g2"})
+        after = datetime.now()
+        await composer.stop()
+
+        flushed = [entry for call in composer._update_lead_tracking_batch.await_args_list for entry in call.args[0]]
+        assert [result["gmail_id"] for _, _, result, _ in flushed] == ["g1", "g2"]
+        assert all(before <= sent_at <= after for _, _, _, sent_at in flushed)
+        assert composer._tracking_worker is None
+
+    @pytest.mark.asyncio
+    async def test_get_email_status_picks_first_tracking_summary(self, composer):
+        """Test tracking ids are looked up together and the first hit wins"""
+        composer.redis_client = Mock(get=AsyncMock(
+            return_value=b'{"gmail_id": "g1", "tracking_ids": ["t1", "t2", "t3"]}'
+        ))
+        summaries = {"t1": None, "t2": {"opens": 2}, "t3": {"opens": 5}}
+        composer.gmail_client = Mock(get_tracking_summary=AsyncMock(side_effect=summaries.get))
+
+        status = await composer.get_email_status("msg_1")
+
+        assert status["gmail_tracking"] == {"opens": 2}
+        assert status["status"] == "sent"
+        assert composer.gmail_client.get_tracking_summary.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_get_email_status_is_cached(self, composer):
+        """Test repeated status polls within the TTL skip Redis and Gmail"""
+        composer.redis_client = Mock(get=AsyncMock(return_value=b'{"gmail_id": "g1", "tracking_ids": ["t1"]}'))
+        composer.gmail_client = Mock(get_tracking_summary=AsyncMock(return_value={"opens": 1}))
+
+        first = await composer.get_email_status("msg_1")
+        second = await composer.get_email_status("msg_1")
+
+        assert first == second
+        assert composer.redis_client.get.await_count == 1
+        assert composer.gmail_client.get_tracking_summary.await_count == 1
+
+    # ========== Response rate prediction ==========
+
+    def test_predict_response_rate_batch_matches_single(self, composer, sample_lead, sample_config):
+        """Test batch prediction agrees with per-message prediction"""
+        message = composer.compose_outreach_sync(sample_lead, sample_config)
+
+        rates = composer.predict_response_rate_batch([message, message], [sample_lead, sample_lead])
+
+        assert rates == [composer.predict_response_rate(message, sample_lead)] * 2
+
+    def test_response_heuristic_keys_on_lead_fields(self, composer, sample_lead):
+        """Test the memoized heuristic still reacts to the lead it is scored against"""
+        message = {"subject": "Quick question", "body": "Hi John, quick question about TestTech Inc."}
+        other_lead = sample_lead.copy(update={
+            "contact": sample_lead.contact.copy(update={"first_name": "Maria"})
+        })
+
+        personalized = composer._calculate_response_probability_heuristic(message, sample_lead)
+
+        assert composer._calculate_response_probability_heuristic(message, sample_lead) == personalized
+        assert composer._calculate_response_probability_heuristic(message, other_lead) < personalized
+
+    @pytest.mark.asyncio
+    async def test_predict_response_rate_ai_batch_uses_one_call(self, sample_lead):
+        """Test uncached messages share one AI call and cached ones are reused"""
+        composer = OutreachComposerAgent(mode="ai", config={"ai_provider": "mock"})
+        composer.ai_engine.generate = AsyncMock(
+            return_value=Mock(content='[{"probability": 0.3}, {"probability": 0.6}]')
+        )
+        messages = [
+            {"subject": "Quick question", "body": "Hi John, quick question about TestTech."},
+            {"subject": "Idea for TestTech", "body": "Hi John, an idea for your sales team."}
+        ]
+
+        first = await composer._predict_response_rate_ai_batch(messages, [sample_lead] * 2)
+        second = await composer._predict_response_rate_ai_batch(messages, [sample_lead] * 2)
+
+        assert first == second == [0.3, 0.6]
+        assert composer.ai_engine.generate.await_count == 1
+
+    def test_rate_cache_key_separates_subject_and_body(self, composer, sample_lead):
+        """Test moving text across the subject/body boundary changes the cache key"""
+        first = composer._rate_cache_key({"subject": "ab", "body": "c"}, sample_lead)
+        second = composer._rate_cache_key({"subject": "a", "body": "bc"}, sample_lead)
+
+        assert first != second
+
+    @pytest.mark.asyncio
+    async def test_predict_response_rate_ai_is_cached(self, sample_lead):
+        """Test repeated predictions for the same message skip the AI engine"""
+        composer = OutreachComposerAgent(mode="ai", config={"ai_provider": "mock"})
+        composer.ai_engine.generate = AsyncMock(return_value=Mock(content='{"probability": 0.42}'))
+        message = {"subject": "Quick question", "body": "Hi John, quick question about TestTech."}
+
+        first = await composer._predict_response_rate_ai(message, sample_lead)
+        second = await composer._predict_response_rate_ai(message, sample_lead)
+
+        assert first == second == 0.42
+        assert composer.ai_engine.generate.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_predictions_share_a_batch_window(self, sample_lead):
+        """Test predictions made within one batch window go out as one AI call"""
+        composer = OutreachComposerAgent(
+            mode="hybrid", config={"ai_provider": "mock", "ai_batch_window_ms": 10}
+        )
+        composer.ai_engine.generate = AsyncMock(
+            return_value=Mock(content='[{"probability": 0.3}, {"probability": 0.6}]')
+        )
+        messages = [
+            {"subject": "Quick question", "body": "Hi John, quick question about TestTech."},
+            {"subject": "Idea for TestTech", "body": "Hi John, an idea for your sales team."}
+        ]
+
+        rates = await asyncio.gather(
+            *(composer._predict_response_rate_ai(message, sample_lead) for message in messages)
+        )
+
+        assert rates == [0.3, 0.6]
+        assert composer.ai_engine.generate.await_count == 1